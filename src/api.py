@@ -2,24 +2,39 @@
 B3 Tracker - REST API
 FastAPI server for accessing market data, signals, and reports
 """
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.openapi.utils import get_openapi
+from contextlib import asynccontextmanager
 from datetime import datetime
+from operator import attrgetter
 from typing import Optional, List
 import os
 import sys
+import time
+import orjson
 
 # Add src to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database import SessionLocal, init_db
-from models import Asset, Quote
-from sqlalchemy import desc
+import cache
+from database import get_db, init_db
+from exporter import generate_report_data
+from fetcher import fetch_all_quotes
+from models import Asset, Quote, latest_quote_subquery
+from signals import SIGNAL_BITS, detect, from_mask
+from sqlalchemy import and_, case, desc, false, func, literal, select, union_all
+from sqlalchemy.orm import Session, contains_eager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Bring the schema up to date under any ASGI host (init_db is idempotent and serialized across workers)"""
+    init_db()
+    yield
 
-# Initialize database
-init_db()
 
 # API Description
 API_DESCRIPTION = """
@@ -67,6 +82,8 @@ app = FastAPI(
     title="B3 Tracker API",
     description=API_DESCRIPTION,
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_tags=[
@@ -109,131 +126,204 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON payloads (quotes/report repeat the same keys per row)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 
 # =============================================================================
 # HELPERS
 # =============================================================================
 
+def signal_bits_cte():
+    """Constant (signal, bit) rows for every signal, to unnest signals_mask in SQL"""
+    return union_all(*[
+        select(literal(name).label("signal"), literal(bit).label("bit"))
+        for name, bit in SIGNAL_BITS.items()
+    ]).cte("signal_bits")
+
+
+# The report is keyed by the last fetch, so it only needs to expire eventually
+REPORT_TTL = 24 * 60 * 60
+
+# /api/news item keys, in the order of the news query's leading columns
+NEWS_KEYS = (
+    "ticker", "name", "sentiment_score", "sentiment_label",
+    "news_count", "latest_headline", "price_brl", "change_1d_pct",
+)
+
+# Upper bound for a refresh holding the lock (a full fetch takes ~30s)
+REFRESH_LOCK_TTL = 15 * 60
+
+# Asset types accepted by the ?type= filters
+ASSET_TYPES = ("stock", "us_stock", "commodity", "crypto", "currency")
+
+
 def get_latest_quotes(db, asset_type: Optional[str] = None, limit: int = 200):
-    """Get latest quote for each asset"""
-    from sqlalchemy import func
+    """Get latest quote for each asset as Row tuples of QUOTE_PATHS (no ORM objects)"""
+    latest = latest_quote_subquery(db, asset_type)
+    selected = [
+        getattr(Asset, path[len("asset."):]) if path.startswith("asset.") else getattr(latest, path)
+        for path in QUOTE_PATHS
+    ]
+    
+    query = db.query(*selected).select_from(latest).join(latest.asset)
+    return query.limit(limit).all()
+
+
+_timestamp = (0, "")
+
+
+def now_iso() -> str:
+    """Response timestamp (local time, second precision), formatted once per second"""
+    global _timestamp
+    second = int(time.time())
+    if _timestamp[0] != second:
+        _timestamp = (second, datetime.fromtimestamp(second).isoformat())
+    return _timestamp[1]
+
+
+def cached_response(key: str) -> Optional[Response]:
+    """Return the cached JSON body for key, if still fresh"""
+    body = cache.get_cached(key)
+    if body is None:
+        return None
+    return Response(content=body, media_type="application/json")
+
+
+def cache_response(key: str, content: dict, ttl: int = cache.CACHE_TTL) -> ORJSONResponse:
+    """Serialize content once and keep the body for subsequent requests"""
+    response = ORJSONResponse(content=content)
+    cache.set_cached(key, response.body, ttl)
+    return response
+
+
+def stream_response(key: str, head: dict, rows, row_to_dict) -> StreamingResponse:
+    """Stream {**head, "data": [...]} one row at a time, caching the full body at the end"""
+    def dumps(obj) -> bytes:
+        # Same options as ORJSONResponse, so streamed and cached bodies match it
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
     
-    # Subquery to get max quote_date per asset
-    subq = db.query(
-        Quote.asset_id,
-        func.max(Quote.quote_date).label('max_date')
-    ).group_by(Quote.asset_id).subquery()
+    def generate():
+        chunks = [dumps(head)[:-1] + b',"data":[']
+        yield chunks[0]
+        for i, row in enumerate(rows):
+            chunk = dumps(row_to_dict(row))
+            if i:
+                chunk = b"," + chunk
+            chunks.append(chunk)
+            yield chunk
+        chunks.append(b"]}")
+        yield chunks[-1]
+        cache.set_cached(key, b"".join(chunks))
     
-    # Main query
-    query = db.query(Quote).join(
-        subq,
-        (Quote.asset_id == subq.c.asset_id) & (Quote.quote_date == subq.c.max_date)
-    ).join(Asset)
+    return StreamingResponse(generate(), media_type="application/json")
+
+
+def refresh_quotes():
+    """Fetch all quotes and drop cached responses built from stale data"""
+    try:
+        fetch_all_quotes()
+        cache.invalidate()
+    finally:
+        cache.release_lock("refresh")
+
+
+# quote_to_dict output keys -> Quote attribute paths, in response order
+QUOTE_FIELDS = (
+    ("ticker", "asset.ticker"),
+    ("name", "asset.name"),
+    ("type", "asset.asset_type"),
+    ("sector", "asset.sector"),
+    ("quote_date", "quote_date"),
+    
+    # Prices
+    ("price_brl", "price_brl"),
+    ("price_usd", "price_usd"),
+    
+    # Changes
+    ("change_1d_pct", "change_1d"),
+    ("change_1w_pct", "change_1w"),
+    ("change_1m_pct", "change_1m"),
+    ("change_ytd_pct", "change_ytd"),
+    
+    # Technical indicators
+    ("rsi_14", "rsi_14"),
+    ("ma_50", "ma_50"),
+    ("ma_200", "ma_200"),
+    ("above_ma50", "above_ma_50"),
+    ("above_ma200", "above_ma_200"),
+    ("golden_cross", "ma_50_above_200"),
+    
+    # 52 week range
+    ("week_52_high", "week_52_high"),
+    ("week_52_low", "week_52_low"),
+    ("pct_from_52w_high", "pct_from_52w_high"),
+    
+    # Volume
+    ("volume", "volume"),
+    ("avg_volume", "avg_volume_20d"),
+    ("volume_ratio", "volume_ratio"),
+    
+    # Fundamentals
+    ("pe_ratio", "pe_ratio"),
+    ("pb_ratio", "pb_ratio"),
+    ("dividend_yield", "dividend_yield"),
+    ("beta", "beta"),
+    ("roe", "roe"),
+    ("market_cap", "market_cap"),
+    
+    # Benchmark comparison
+    ("vs_ibov_1d", "vs_ibov_1d"),
+    ("vs_ibov_ytd", "vs_ibov_ytd"),
+    ("vs_sp500_1d", "vs_sp500_1d"),
+    ("vs_sp500_ytd", "vs_sp500_ytd"),
+    
+    # News sentiment (news_count/latest_headline are completed in quote_to_dict)
+    ("news_sentiment_score", "news_sentiment_combined"),
+    ("news_sentiment_label", "news_sentiment_label"),
+    ("news_count", "news_count_pt"),
+    ("latest_headline", "news_headline_pt"),
+)
+QUOTE_KEYS = tuple(key for key, _ in QUOTE_FIELDS)
+# Extra paths read by quote_row_to_dict to complete news_count/latest_headline
+QUOTE_PATHS = tuple(path for _, path in QUOTE_FIELDS) + ("news_count_en", "news_headline_en")
+_get_quote_values = attrgetter(*QUOTE_PATHS)
+
+
+def quote_row_to_dict(values) -> dict:
+    """Convert a tuple of QUOTE_PATHS values to the quote dictionary"""
+    data = dict(zip(QUOTE_KEYS, values))
+    news_count_en, news_headline_en = values[-2:]
     
-    if asset_type:
-        query = query.filter(Asset.asset_type == asset_type)
+    if data["quote_date"]:
+        data["quote_date"] = data["quote_date"].isoformat()
+    data["above_ma50"] = bool(data["above_ma50"])
+    data["above_ma200"] = bool(data["above_ma200"])
+    data["golden_cross"] = bool(data["golden_cross"])
+    data["news_count"] = (data["news_count"] or 0) + (news_count_en or 0)
+    data["latest_headline"] = data["latest_headline"] or news_headline_en
     
-    return query.limit(limit).all()
+    return data
 
 
 def quote_to_dict(quote: Quote) -> dict:
     """Convert Quote model to dictionary"""
-    return {
-        "ticker": quote.asset.ticker,
-        "name": quote.asset.name,
-        "type": quote.asset.asset_type,
-        "sector": quote.asset.sector,
-        "quote_date": quote.quote_date.isoformat() if quote.quote_date else None,
-        
-        # Prices
-        "price_brl": quote.price_brl,
-        "price_usd": quote.price_usd,
-        
-        # Changes
-        "change_1d_pct": quote.change_1d,
-        "change_1w_pct": quote.change_1w,
-        "change_1m_pct": quote.change_1m,
-        "change_ytd_pct": quote.change_ytd,
-        
-        # Technical indicators
-        "rsi_14": quote.rsi_14,
-        "ma_50": quote.ma_50,
-        "ma_200": quote.ma_200,
-        "above_ma50": bool(quote.above_ma_50),
-        "above_ma200": bool(quote.above_ma_200),
-        "golden_cross": bool(quote.ma_50_above_200),
-        
-        # 52 week range
-        "week_52_high": quote.week_52_high,
-        "week_52_low": quote.week_52_low,
-        "pct_from_52w_high": quote.pct_from_52w_high,
-        
-        # Volume
-        "volume": quote.volume,
-        "avg_volume": quote.avg_volume_20d,
-        "volume_ratio": quote.volume_ratio,
-        
-        # Fundamentals
-        "pe_ratio": quote.pe_ratio,
-        "pb_ratio": quote.pb_ratio,
-        "dividend_yield": quote.dividend_yield,
-        "beta": quote.beta,
-        "roe": quote.roe,
-        "market_cap": quote.market_cap,
-        
-        # Benchmark comparison
-        "vs_ibov_1d": quote.vs_ibov_1d,
-        "vs_ibov_ytd": quote.vs_ibov_ytd,
-        "vs_sp500_1d": quote.vs_sp500_1d,
-        "vs_sp500_ytd": quote.vs_sp500_ytd,
-        
-        # News sentiment
-        "news_sentiment_score": quote.news_sentiment_combined,
-        "news_sentiment_label": quote.news_sentiment_label,
-        "news_count": (quote.news_count_pt or 0) + (quote.news_count_en or 0),
-        "latest_headline": quote.news_headline_pt or quote.news_headline_en,
-    }
+    return quote_row_to_dict(_get_quote_values(quote))
 
 
 def detect_signals(quote: Quote) -> List[str]:
     """Detect trading signals for a quote"""
-    signals = []
-    
-    # RSI signals
-    if quote.rsi_14:
-        if quote.rsi_14 < 30:
-            signals.append("RSI_OVERSOLD")
-        elif quote.rsi_14 > 70:
-            signals.append("RSI_OVERBOUGHT")
-    
-    # Moving average signals
-    if quote.ma_50_above_200:
-        signals.append("GOLDEN_CROSS")
-    if quote.above_ma_50 and quote.above_ma_200:
-        signals.append("BULLISH_TREND")
-    elif quote.above_ma_50 == 0 and quote.above_ma_200 == 0:
-        signals.append("BEARISH_TREND")
-    
-    # 52 week signals
-    if quote.pct_from_52w_high is not None and quote.pct_from_52w_high > -5:
-        signals.append("NEAR_52W_HIGH")
-    if quote.week_52_low and quote.price_brl:
-        pct_from_low = ((quote.price_brl - quote.week_52_low) / quote.week_52_low) * 100
-        if pct_from_low < 5:
-            signals.append("NEAR_52W_LOW")
-    
-    # Volume spike
-    if quote.volume_ratio and quote.volume_ratio > 2.0:
-        signals.append("VOLUME_SPIKE")
-    
-    # News sentiment
-    if quote.news_sentiment_combined:
-        if quote.news_sentiment_combined > 0.3:
-            signals.append("POSITIVE_NEWS")
-        elif quote.news_sentiment_combined < -0.3:
-            signals.append("NEGATIVE_NEWS")
-    
-    return signals
+    return list(detect(
+        quote.rsi_14,
+        quote.ma_50_above_200,
+        quote.above_ma_50,
+        quote.above_ma_200,
+        quote.pct_from_52w_high,
+        quote.week_52_low,
+        quote.price_brl,
+        quote.volume_ratio,
+        quote.news_sentiment_combined,
+    ))
 
 
 # =============================================================================
@@ -249,11 +339,11 @@ async def root():
     
     Use este endpoint para verificar se a API está funcionando.
     """
-    return {
+    return ORJSONResponse(content={
         "name": "B3 Tracker API",
         "version": "1.0.0",
         "status": "online",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now_iso(),
         "endpoints": {
             "quotes": "/api/quotes",
             "quote": "/api/quotes/{ticker}",
@@ -263,18 +353,19 @@ async def root():
             "sectors": "/api/sectors",
             "docs": "/docs",
         }
-    }
+    })
 
 
 @app.get("/api/quotes", tags=["Cotações"], summary="Listar todas as cotações")
-async def get_quotes(
+def get_quotes(
     type: Optional[str] = Query(
         None, 
         description="Filtrar por tipo de ativo",
-        enum=["stock", "us_stock", "commodity", "crypto", "currency"],
+        enum=list(ASSET_TYPES),
         example="stock"
     ),
-    limit: int = Query(200, description="Número máximo de resultados", ge=1, le=500)
+    limit: int = Query(200, description="Número máximo de resultados", ge=1, le=500),
+    db: Session = Depends(get_db)
 ):
     """
     📊 **Lista todas as cotações atuais**
@@ -294,20 +385,25 @@ async def get_quotes(
     - Dados fundamentalistas (P/E, P/B, DY)
     - Sentimento de notícias
     """
-    db = SessionLocal()
-    try:
-        quotes = get_latest_quotes(db, type, limit)
-        return {
-            "count": len(quotes),
-            "timestamp": datetime.now().isoformat(),
-            "data": [quote_to_dict(q) for q in quotes]
-        }
-    finally:
-        db.close()
+    if type is not None and type not in ASSET_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid type. Use: {list(ASSET_TYPES)}")
+    
+    # Any limit above the number of assets returns the same body: share one cache key
+    limit = min(limit, db.query(func.count(Asset.id)).scalar())
+    key = f"quotes:{type}:{limit}"
+    cached = cached_response(key)
+    if cached is not None:
+        return cached
+    
+    quotes = get_latest_quotes(db, type, limit)
+    return stream_response(key, {
+        "count": len(quotes),
+        "timestamp": now_iso(),
+    }, quotes, quote_row_to_dict)
 
 
 @app.get("/api/quotes/{ticker}", tags=["Cotações"], summary="Cotação de um ativo específico")
-async def get_quote(ticker: str):
+def get_quote(ticker: str, db: Session = Depends(get_db)):
     """
     🔍 **Dados detalhados de um ativo específico**
     
@@ -329,38 +425,34 @@ async def get_quote(ticker: str):
     - Sentimento de notícias
     - **Sinais de trading detectados**
     """
-    db = SessionLocal()
-    try:
-        ticker_upper = ticker.upper()
-        # Try exact match first, then with .SA suffix
-        asset = db.query(Asset).filter(Asset.ticker == ticker_upper).first()
-        if not asset and not ticker_upper.endswith('.SA'):
-            asset = db.query(Asset).filter(Asset.ticker == f"{ticker_upper}.SA").first()
-        
-        if not asset:
-            raise HTTPException(status_code=404, detail=f"Ticker '{ticker}' not found")
-        
-        # Get latest quote
-        quote = db.query(Quote).filter(
-            Quote.asset_id == asset.id
-        ).order_by(desc(Quote.quote_date)).first()
-        
-        if not quote:
+    ticker_upper = ticker.upper()
+    candidates = [ticker_upper]
+    if not ticker_upper.endswith('.SA'):
+        candidates.append(f"{ticker_upper}.SA")
+    
+    # Latest quote and its asset in one JOIN, exact ticker match first
+    quote = db.query(Quote).join(Quote.asset).options(
+        contains_eager(Quote.asset)
+    ).filter(
+        Asset.ticker.in_(candidates)
+    ).order_by(desc(Asset.ticker == ticker_upper), desc(Quote.quote_date)).first()
+    
+    if not quote:
+        if db.query(Asset.id).filter(Asset.ticker.in_(candidates)).first():
             raise HTTPException(status_code=404, detail=f"No quotes found for '{ticker}'")
-        
-        data = quote_to_dict(quote)
-        data["signals"] = detect_signals(quote)
-        
-        return {
-            "timestamp": datetime.now().isoformat(),
-            "data": data
-        }
-    finally:
-        db.close()
+        raise HTTPException(status_code=404, detail=f"Ticker '{ticker}' not found")
+    
+    data = quote_to_dict(quote)
+    data["signals"] = detect_signals(quote)
+    
+    return ORJSONResponse(content={
+        "timestamp": now_iso(),
+        "data": data
+    })
 
 
 @app.get("/api/signals", tags=["Sinais"], summary="Sinais de trading ativos")
-async def get_signals(
+def get_signals(
     signal_type: Optional[str] = Query(
         None, 
         description="Filtrar por tipo de sinal específico",
@@ -368,7 +460,8 @@ async def get_signals(
               "BEARISH_TREND", "NEAR_52W_HIGH", "NEAR_52W_LOW", "VOLUME_SPIKE",
               "POSITIVE_NEWS", "NEGATIVE_NEWS"],
         example="RSI_OVERSOLD"
-    )
+    ),
+    db: Session = Depends(get_db)
 ):
     """
     🚦 **Sinais de Trading Detectados**
@@ -392,53 +485,70 @@ async def get_signals(
     
     **Exemplo:** `GET /api/signals?signal_type=RSI_OVERSOLD`
     """
-    db = SessionLocal()
-    try:
-        quotes = get_latest_quotes(db)
-        
-        signals_data = {}
-        for quote in quotes:
-            signals = detect_signals(quote)
-            if signals:
-                if signal_type and signal_type.upper() not in signals:
-                    continue
-                    
-                signals_data[quote.asset.ticker] = {
-                    "name": quote.asset.name,
-                    "type": quote.asset.asset_type,
-                    "price_brl": quote.price_brl,
-                    "change_1d_pct": quote.change_1d,
-                    "rsi_14": quote.rsi_14,
-                    "signals": signals,
-                    "news_sentiment": quote.news_sentiment_label,
-                }
-        
-        # Group by signal type
-        signal_groups = {}
-        for ticker, data in signals_data.items():
-            for sig in data["signals"]:
-                if sig not in signal_groups:
-                    signal_groups[sig] = []
-                signal_groups[sig].append(ticker)
-        
-        return {
-            "count": len(signals_data),
-            "timestamp": datetime.now().isoformat(),
-            "by_signal": signal_groups,
-            "data": signals_data
+    key = f"signals:{signal_type.upper() if signal_type else None}"
+    cached = cached_response(key)
+    if cached is not None:
+        return cached
+    
+    latest = latest_quote_subquery(db)
+    
+    # Signals are precomputed by the fetcher; only matching rows leave the database
+    if signal_type:
+        bit = SIGNAL_BITS.get(signal_type.upper())
+        match = latest.signals_mask.op('&')(bit) != 0 if bit else false()
+    else:
+        match = latest.signals_mask != 0
+    
+    rows = db.query(
+        Asset.ticker,
+        Asset.name,
+        Asset.asset_type,
+        latest.price_brl,
+        latest.change_1d,
+        latest.rsi_14,
+        latest.news_sentiment_label,
+        latest.signals_mask,
+    ).select_from(latest).join(latest.asset).filter(match).all()
+    
+    signals_data = {}
+    for row in rows:
+        signals_data[row.ticker] = {
+            "name": row.name,
+            "type": row.asset_type,
+            "price_brl": row.price_brl,
+            "change_1d_pct": row.change_1d,
+            "rsi_14": row.rsi_14,
+            "signals": from_mask(row.signals_mask),
+            "news_sentiment": row.news_sentiment_label,
         }
-    finally:
-        db.close()
+    
+    # Group tickers by signal: one row per (signal bit, matching quote) pair
+    bits = signal_bits_cte()
+    groups = db.query(
+        bits.c.signal,
+        func.group_concat(Asset.ticker),
+    ).select_from(latest).join(latest.asset).join(
+        bits, latest.signals_mask.op('&')(bits.c.bit) != 0
+    ).filter(match).group_by(bits.c.signal).order_by(func.min(bits.c.bit)).all()
+    signal_groups = {signal: tickers.split(",") for signal, tickers in groups}
+    
+    return cache_response(key, {
+        "count": len(signals_data),
+        "timestamp": now_iso(),
+        "by_signal": signal_groups,
+        "data": signals_data
+    })
 
 
 @app.get("/api/news", tags=["Notícias"], summary="Sentimento de notícias")
-async def get_news(
+def get_news(
     sentiment: Optional[str] = Query(
         None, 
         description="Filtrar por sentimento",
         enum=["positive", "negative", "neutral"],
         example="positive"
-    )
+    ),
+    db: Session = Depends(get_db)
 ):
     """
     📰 **Análise de Sentimento de Notícias**
@@ -460,58 +570,61 @@ async def get_news(
     
     **Exemplo:** `GET /api/news?sentiment=positive`
     """
-    db = SessionLocal()
-    try:
-        quotes = get_latest_quotes(db)
-        
-        news_data = []
-        for quote in quotes:
-            news_count = (quote.news_count_pt or 0) + (quote.news_count_en or 0)
-            if news_count > 0:
-                score = quote.news_sentiment_combined or 0
-                # Apply sentiment filter
-                if sentiment:
-                    if sentiment.lower() == "positive" and score <= 0.1:
-                        continue
-                    elif sentiment.lower() == "negative" and score >= -0.1:
-                        continue
-                    elif sentiment.lower() == "neutral" and abs(score) > 0.1:
-                        continue
-                
-                news_data.append({
-                    "ticker": quote.asset.ticker,
-                    "name": quote.asset.name,
-                    "sentiment_score": score,
-                    "sentiment_label": quote.news_sentiment_label,
-                    "news_count": news_count,
-                    "latest_headline": quote.news_headline_pt or quote.news_headline_en,
-                    "price_brl": quote.price_brl,
-                    "change_1d_pct": quote.change_1d,
-                })
-        
-        # Sort by sentiment score
-        news_data.sort(key=lambda x: x["sentiment_score"] or 0, reverse=True)
-        
-        # Summary
-        positive = [n for n in news_data if (n["sentiment_score"] or 0) > 0.1]
-        negative = [n for n in news_data if (n["sentiment_score"] or 0) < -0.1]
-        
-        return {
-            "count": len(news_data),
-            "timestamp": datetime.now().isoformat(),
-            "summary": {
-                "positive_count": len(positive),
-                "negative_count": len(negative),
-                "neutral_count": len(news_data) - len(positive) - len(negative),
-            },
-            "data": news_data
-        }
-    finally:
-        db.close()
+    sentiment = sentiment.lower() if sentiment else None
+    key = f"news:{sentiment}"
+    cached = cached_response(key)
+    if cached is not None:
+        return cached
+    
+    latest = latest_quote_subquery(db)
+    score = func.coalesce(latest.news_sentiment_combined, 0)
+    news_count = func.coalesce(latest.news_count_pt, 0) + func.coalesce(latest.news_count_en, 0)
+    is_positive = score > 0.1
+    is_negative = score < -0.1
+    
+    # Apply sentiment filter
+    filters = [news_count > 0]
+    if sentiment == "positive":
+        filters.append(is_positive)
+    elif sentiment == "negative":
+        filters.append(is_negative)
+    elif sentiment == "neutral":
+        filters.append(~is_positive & ~is_negative)
+    
+    # Filter, sort by sentiment score and count the summary in one query
+    rows = db.query(
+        Asset.ticker,
+        Asset.name,
+        score.label("sentiment_score"),
+        latest.news_sentiment_label.label("sentiment_label"),
+        news_count.label("news_count"),
+        func.coalesce(
+            func.nullif(latest.news_headline_pt, ""), latest.news_headline_en
+        ).label("latest_headline"),
+        latest.price_brl,
+        latest.change_1d.label("change_1d_pct"),
+        func.sum(case((is_positive, 1), else_=0)).over().label("positive_count"),
+        func.sum(case((is_negative, 1), else_=0)).over().label("negative_count"),
+    ).select_from(latest).join(latest.asset).filter(*filters).order_by(score.desc()).all()
+    
+    news_data = [dict(zip(NEWS_KEYS, row)) for row in rows]
+    positive_count = rows[0].positive_count if rows else 0
+    negative_count = rows[0].negative_count if rows else 0
+    
+    return cache_response(key, {
+        "count": len(news_data),
+        "timestamp": now_iso(),
+        "summary": {
+            "positive_count": positive_count,
+            "negative_count": negative_count,
+            "neutral_count": len(news_data) - positive_count - negative_count,
+        },
+        "data": news_data
+    })
 
 
 @app.get("/api/sectors", tags=["Análise"], summary="Performance por setor")
-async def get_sectors():
+def get_sectors(db: Session = Depends(get_db)):
     """
     🏭 **Performance Agregada por Setor**
     
@@ -525,66 +638,53 @@ async def get_sectors():
     
     Ordenado por performance YTD (melhor primeiro).
     """
-    db = SessionLocal()
-    try:
-        quotes = get_latest_quotes(db, asset_type="stock")
-        
-        sectors = {}
-        for quote in quotes:
-            sector = quote.asset.sector or "Outros"
-            if sector not in sectors:
-                sectors[sector] = {
-                    "count": 0,
-                    "tickers": [],
-                    "avg_change_1d": 0,
-                    "avg_change_ytd": 0,
-                    "avg_rsi": 0,
-                    "bullish_count": 0,
-                    "bearish_count": 0,
-                }
-            
-            sectors[sector]["count"] += 1
-            sectors[sector]["tickers"].append(quote.asset.ticker)
-            
-            if quote.change_1d:
-                sectors[sector]["avg_change_1d"] += quote.change_1d
-            if quote.change_ytd:
-                sectors[sector]["avg_change_ytd"] += quote.change_ytd
-            if quote.rsi_14:
-                sectors[sector]["avg_rsi"] += quote.rsi_14
-            
-            # Count bullish/bearish
-            if quote.above_ma_50 and quote.above_ma_200:
-                sectors[sector]["bullish_count"] += 1
-            elif quote.above_ma_50 == 0 and quote.above_ma_200 == 0:
-                sectors[sector]["bearish_count"] += 1
-        
-        # Calculate averages
-        for sector, data in sectors.items():
-            n = data["count"]
-            if n > 0:
-                data["avg_change_1d"] = round(data["avg_change_1d"] / n, 2)
-                data["avg_change_ytd"] = round(data["avg_change_ytd"] / n, 2)
-                data["avg_rsi"] = round(data["avg_rsi"] / n, 1)
-        
-        # Sort by YTD performance
-        sorted_sectors = dict(sorted(
-            sectors.items(), 
-            key=lambda x: x[1]["avg_change_ytd"], 
-            reverse=True
-        ))
-        
-        return {
-            "count": len(sorted_sectors),
-            "timestamp": datetime.now().isoformat(),
-            "data": sorted_sectors
+    cached = cached_response("sectors")
+    if cached is not None:
+        return cached
+    
+    latest = latest_quote_subquery(db, asset_type="stock")
+    sector = case((Asset.sector == "", "Outros"), else_=Asset.sector)
+    count = func.count()
+    sum_ytd = func.coalesce(func.sum(latest.change_ytd), 0)
+    
+    # Aggregate per sector in SQL, best YTD first
+    rows = db.query(
+        sector.label("sector"),
+        count.label("count"),
+        func.group_concat(Asset.ticker).label("tickers"),
+        func.coalesce(func.sum(latest.change_1d), 0).label("sum_1d"),
+        sum_ytd.label("sum_ytd"),
+        func.coalesce(func.sum(latest.rsi_14), 0).label("sum_rsi"),
+        func.sum(case(
+            (and_(latest.above_ma_50 != 0, latest.above_ma_200 != 0), 1), else_=0
+        )).label("bullish_count"),
+        func.sum(case(
+            (and_(latest.above_ma_50 == 0, latest.above_ma_200 == 0), 1), else_=0
+        )).label("bearish_count"),
+    ).select_from(latest).join(latest.asset).group_by(sector).order_by(desc(sum_ytd / count)).all()
+    
+    sorted_sectors = {
+        row.sector: {
+            "count": row.count,
+            "tickers": row.tickers.split(","),
+            "avg_change_1d": round(row.sum_1d / row.count, 2),
+            "avg_change_ytd": round(row.sum_ytd / row.count, 2),
+            "avg_rsi": round(row.sum_rsi / row.count, 1),
+            "bullish_count": row.bullish_count,
+            "bearish_count": row.bearish_count,
         }
-    finally:
-        db.close()
+        for row in rows
+    }
+    
+    return cache_response("sectors", {
+        "count": len(sorted_sectors),
+        "timestamp": now_iso(),
+        "data": sorted_sectors
+    })
 
 
 @app.get("/api/report", tags=["Análise"], summary="Relatório consolidado")
-async def get_report():
+def get_report(db: Session = Depends(get_db)):
     """
     📋 **Relatório Consolidado para AI**
     
@@ -594,26 +694,32 @@ async def get_report():
     - Contexto de mercado (IBOV YTD, S&P 500 YTD, USD/BRL)
     - Top movers (maiores altas e quedas)
     - Resumo de sinais por tipo
-    - Sentimento de notícias
+    - Sentimento de notícias (com a manchete de cada ação listada em `headlines`)
     - Insights acionáveis (potential_buys, potential_sells, momentum_stocks)
     - Dados completos de todos os ativos
     
     Este é o mesmo relatório gerado pelo comando `--report`.
     """
-    from exporter import generate_report_data
+    # Any fetch (API refresh or scheduler) bumps the key; MAX over the
+    # indexed fetched_at is one index lookup, not a scan of quotes
+    last_fetch = db.query(func.max(Quote.fetched_at)).scalar()
+    key = f"report:{last_fetch.isoformat() if last_fetch else ''}"
+    cached = cached_response(key)
+    if cached is not None:
+        return cached
     
     try:
         data = generate_report_data()
-        return {
-            "timestamp": datetime.now().isoformat(),
+        return cache_response(key, {
+            "timestamp": now_iso(),
             "report": data
-        }
+        }, ttl=REPORT_TTL)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/refresh", tags=["Sistema"], summary="Atualizar dados")
-async def refresh_data(background_tasks: BackgroundTasks):
+def refresh_data(background_tasks: BackgroundTasks):
     """
     🔄 **Disparar Atualização de Dados**
     
@@ -621,31 +727,40 @@ async def refresh_data(background_tasks: BackgroundTasks):
     
     **Comportamento:**
     - Retorna imediatamente com status "started"
+    - Se já houver uma atualização em andamento, retorna status "running"
     - Dados são atualizados em ~30 segundos (fetch paralelo)
     - Consulte `/api/quotes` para ver dados atualizados
     
     **Nota:** Use com moderação para evitar rate limiting das APIs.
     """
-    from fetcher import fetch_all_quotes
-    
-    background_tasks.add_task(fetch_all_quotes)
-    
-    return {
+    # Collapse concurrent refreshes (across workers when Redis is available).
+    # Plain def: try_lock can block on Redis, so this runs in the threadpool
+    if not cache.try_lock("refresh", REFRESH_LOCK_TTL):
+        return ORJSONResponse(content={
+            "status": "running",
+            "message": "A data refresh is already in progress. Check /api/quotes for updated data.",
+            "timestamp": now_iso(),
+        })
+    
+    background_tasks.add_task(refresh_quotes)
+    
+    return ORJSONResponse(content={
         "status": "started",
         "message": "Data refresh started in background. Check /api/quotes for updated data.",
-        "timestamp": datetime.now().isoformat(),
-    }
+        "timestamp": now_iso(),
+    })
 
 
 @app.get("/api/movers", tags=["Cotações"], summary="Top gainers e losers")
-async def get_movers(
+def get_movers(
     period: str = Query(
         "1d", 
         description="Período de análise",
         enum=["1d", "1w", "1m", "ytd"],
         example="ytd"
     ),
-    limit: int = Query(10, description="Número de ativos por lista", ge=1, le=50)
+    limit: int = Query(10, description="Número de ativos por lista", ge=1, le=50),
+    db: Session = Depends(get_db)
 ):
     """
     🔥 **Maiores Altas e Quedas**
@@ -660,47 +775,44 @@ async def get_movers(
     
     **Exemplo:** `GET /api/movers?period=ytd&limit=5`
     """
-    db = SessionLocal()
-    try:
-        quotes = get_latest_quotes(db)
-        
-        # Map period to field
-        field_map = {
-            "1d": "change_1d",
-            "1w": "change_1w", 
-            "1m": "change_1m",
-            "ytd": "change_ytd",
-        }
-        
-        if period not in field_map:
-            raise HTTPException(status_code=400, detail=f"Invalid period. Use: {list(field_map.keys())}")
-        
-        field = field_map[period]
-        
-        # Filter quotes with valid data
-        valid_quotes = []
-        for q in quotes:
-            change = getattr(q, field, None)
-            if change is not None:
-                valid_quotes.append({
-                    "ticker": q.asset.ticker,
-                    "name": q.asset.name,
-                    "type": q.asset.asset_type,
-                    "price_brl": q.price_brl,
-                    "change_pct": change,
-                })
-        
-        # Sort
-        sorted_quotes = sorted(valid_quotes, key=lambda x: x["change_pct"], reverse=True)
-        
-        return {
-            "period": period,
-            "timestamp": datetime.now().isoformat(),
-            "gainers": sorted_quotes[:limit],
-            "losers": sorted_quotes[-limit:][::-1],
-        }
-    finally:
-        db.close()
+    # Map period to field
+    field_map = {
+        "1d": "change_1d",
+        "1w": "change_1w", 
+        "1m": "change_1m",
+        "ytd": "change_ytd",
+    }
+    
+    if period not in field_map:
+        raise HTTPException(status_code=400, detail=f"Invalid period. Use: {list(field_map.keys())}")
+    
+    field = field_map[period]
+    key = f"movers:{period}:{limit}"
+    cached = cached_response(key)
+    if cached is not None:
+        return cached
+    
+    latest = latest_quote_subquery(db)
+    change = getattr(latest, field)
+    
+    # Only the top/bottom N rows with valid data leave the database
+    movers = db.query(
+        Asset.ticker,
+        Asset.name,
+        Asset.asset_type.label("type"),
+        latest.price_brl,
+        change.label("change_pct"),
+    ).select_from(latest).join(latest.asset).filter(change.isnot(None))
+    
+    gainers = movers.order_by(change.desc()).limit(limit).all()
+    losers = movers.order_by(change.asc()).limit(limit).all()
+    
+    return cache_response(key, {
+        "period": period,
+        "timestamp": now_iso(),
+        "gainers": [row._asdict() for row in gainers],
+        "losers": [row._asdict() for row in losers],
+    })
 
 
 # =============================================================================
@@ -709,4 +821,28 @@ async def get_movers(
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Migrate once before the workers start; their lifespan init_db then finds nothing to do
+    init_db()
+    
+    # Development: reload on source changes (a single process, so API_WORKERS is ignored)
+    reload = os.environ.get("API_RELOAD", "false").lower() == "true"
+    
+    # Without Redis the response cache, the refresh lock and memoize live in each process:
+    # other workers would keep serving stale bodies after /api/refresh
+    shared = cache.is_shared()
+    default_workers = (os.cpu_count() or 1) if shared else 1
+    workers = 1 if reload else int(os.environ.get("API_WORKERS", default_workers))
+    if workers > 1 and not shared:
+        sys.exit("❌ API_WORKERS > 1 requires a reachable Redis (REDIS_URL): cache and refresh lock are per process without it")
+    
+    # Multiple workers/reload need the app as an import string;
+    # uvloop/httptools are picked up automatically when installed (uvicorn[standard])
+    uvicorn.run(
+        "api:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=workers,
+        reload=reload,
+        reload_dirs=[os.path.dirname(os.path.abspath(__file__))] if reload else None,
+        access_log=False,
+    )
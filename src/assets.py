@@ -1,6 +1,7 @@
 """
 Lista de ativos para rastrear: Ações B3 (Ibovespa) + Commodities + Crypto
 """
+from types import MappingProxyType
 
 # Ações do Ibovespa com seus setores
 IBOVESPA_STOCKS = {
@@ -171,17 +172,21 @@ US_STOCKS = {
     "CVX": {"name": "Chevron", "sector": "Petróleo e Gás"},
 }
 
+# Todos os ativos, montado uma vez no import (somente leitura)
+ALL_ASSETS = MappingProxyType({
+    **IBOVESPA_STOCKS,
+    **US_STOCKS,
+    **COMMODITIES,
+    **CRYPTO,
+    **CURRENCY,
+})
+
+UNKNOWN_ASSET = MappingProxyType({"name": "Desconhecido", "sector": "Outro"})
+
 def get_all_assets():
     """Retorna todos os ativos para rastrear"""
-    all_assets = {}
-    all_assets.update(IBOVESPA_STOCKS)
-    all_assets.update(US_STOCKS)
-    all_assets.update(COMMODITIES)
-    all_assets.update(CRYPTO)
-    all_assets.update(CURRENCY)
-    return all_assets
+    return ALL_ASSETS
 
 def get_asset_info(ticker):
     """Retorna informações de um ativo específico"""
-    all_assets = get_all_assets()
-    return all_assets.get(ticker, {"name": "Desconhecido", "sector": "Outro"})
+    return ALL_ASSETS.get(ticker, UNKNOWN_ASSET)
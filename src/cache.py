@@ -0,0 +1,166 @@
+"""
+Cache de respostas serializadas (Redis opcional, com fallback em memória)
+"""
+import os
+import time
+import threading
+from functools import wraps
+from typing import Optional
+
+# Sem REDIS_URL o cache fica em memória, local a cada processo
+REDIS_URL = os.environ.get("REDIS_URL")
+CACHE_TTL = int(os.environ.get("CACHE_TTL", "60"))
+# Máximo de chaves do cache em memória (e de cada memoize): expirados saem primeiro, depois os mais antigos
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "256"))
+KEY_PREFIX = "b3:"
+
+_redis = None
+if REDIS_URL:
+    try:
+        import redis
+        # Timeouts curtos: com o Redis fora do ar, o cache cai logo para a memória
+        _redis = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=2, socket_timeout=2)
+    except Exception as e:
+        print(f"⚠️ Redis not available: {e}")
+        _redis = None
+
+_local = {}
+_locks = {}
+_lock = threading.Lock()
+
+
+def _store(entries: dict, key, value, expires_at: float, max_entries: int):
+    """Grava (expires_at, value) em entries mantendo no máximo max_entries chaves (chamar com o lock)"""
+    entries.pop(key, None)
+    if len(entries) >= max_entries:
+        now = time.monotonic()
+        for k in [k for k, (expires, _) in entries.items() if expires <= now]:
+            del entries[k]
+        # dict preserva a ordem de inserção: as primeiras chaves são as gravadas há mais tempo
+        while len(entries) >= max_entries:
+            del entries[next(iter(entries))]
+    entries[key] = (expires_at, value)
+
+
+def is_shared() -> bool:
+    """True quando cache e locks são compartilhados entre processos (Redis configurado e respondendo)"""
+    if _redis is None:
+        return False
+    try:
+        return bool(_redis.ping())
+    except Exception as e:
+        print(f"⚠️ Redis ping error: {e}")
+        return False
+
+
+def get_cached(key: str) -> Optional[bytes]:
+    """Retorna o valor em cache ou None se ausente/expirado"""
+    if _redis is not None:
+        try:
+            return _redis.get(KEY_PREFIX + key)
+        except Exception as e:
+            print(f"⚠️ Redis get error: {e}")
+
+    with _lock:
+        entry = _local.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del _local[key]
+            return None
+    return value
+
+
+def set_cached(key: str, value: bytes, ttl: int = CACHE_TTL):
+    """Armazena um valor com expiração em segundos"""
+    if _redis is not None:
+        try:
+            _redis.set(KEY_PREFIX + key, value, ex=ttl)
+            return
+        except Exception as e:
+            print(f"⚠️ Redis set error: {e}")
+
+    with _lock:
+        _store(_local, key, value, time.monotonic() + ttl, CACHE_MAX_ENTRIES)
+
+
+def invalidate(prefix: str = ""):
+    """Remove todas as chaves que começam com prefix (tudo, por padrão)"""
+    if _redis is not None:
+        try:
+            keys = [
+                key for key in _redis.scan_iter(match=f"{KEY_PREFIX}{prefix}*")
+                if not key.startswith(f"{KEY_PREFIX}lock:".encode())
+            ]
+            if keys:
+                _redis.delete(*keys)
+        except Exception as e:
+            print(f"⚠️ Redis invalidate error: {e}")
+
+    with _lock:
+        for key in [k for k in _local if k.startswith(prefix)]:
+            del _local[key]
+
+
+def try_lock(name: str, ttl: int) -> bool:
+    """Adquire um lock com expiração (entre processos via Redis); False se já estiver em uso"""
+    if _redis is not None:
+        try:
+            return bool(_redis.set(f"{KEY_PREFIX}lock:{name}", b"1", nx=True, ex=ttl))
+        except Exception as e:
+            print(f"⚠️ Redis lock error: {e}")
+    
+    now = time.monotonic()
+    with _lock:
+        expires_at = _locks.get(name)
+        if expires_at is not None and expires_at > now:
+            return False
+        _locks[name] = now + ttl
+    return True
+
+
+def release_lock(name: str):
+    """Libera um lock adquirido com try_lock"""
+    if _redis is not None:
+        try:
+            _redis.delete(f"{KEY_PREFIX}lock:{name}")
+        except Exception as e:
+            print(f"⚠️ Redis unlock error: {e}")
+    
+    with _lock:
+        _locks.pop(name, None)
+
+
+def memoize(ttl: int, key=None, max_entries: int = CACHE_MAX_ENTRIES):
+    """Memoiza o retorno de uma função em memória (por processo) por ttl segundos
+    
+    key(*args, **kwargs) monta a chave; o wrapper ganha cache_clear().
+    Guarda no máximo max_entries chaves (expiradas saem primeiro, depois as mais antigas).
+    """
+    def decorator(func):
+        entries = {}
+        lock = threading.Lock()
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            with lock:
+                entry = entries.get(k)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            
+            value = func(*args, **kwargs)
+            with lock:
+                _store(entries, k, value, now + ttl, max_entries)
+            return value
+        
+        def cache_clear():
+            with lock:
+                entries.clear()
+        
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
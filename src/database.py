@@ -1,16 +1,27 @@
 """
 Configuração do banco de dados SQLite
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, func, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
 # Caminho do banco de dados
 DB_PATH = os.environ.get("DB_PATH", "/app/data/cotacoes.db")
 
-# Criar engine
+# Criar engine (pool padrão: o SQLite tem um único escritor, mais conexões só aumentam a disputa pelo lock)
 engine = create_engine(f"sqlite:///{DB_PATH}", echo=False)
 
+@event.listens_for(engine, "connect")
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL: leituras da API não bloqueiam (nem são bloqueadas por) o fetcher"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -25,8 +36,121 @@ def get_db():
     finally:
         db.close()
 
+# Triggers que mantêm latest_quotes (cotação mais recente por ativo) a cada escrita em quotes
+# O upsert do fetcher (ON CONFLICT DO UPDATE) dispara os triggers de UPDATE, não o de INSERT;
+# como ele não altera asset_id/quote_date, a cotação mais recente não muda e o de UPDATE nem dispara
+LATEST_QUOTES_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS latest_quotes_insert AFTER INSERT ON quotes
+    BEGIN
+        INSERT INTO latest_quotes (asset_id, quote_id, quote_date)
+        VALUES (NEW.asset_id, NEW.id, NEW.quote_date)
+        ON CONFLICT(asset_id) DO UPDATE SET quote_id = excluded.quote_id, quote_date = excluded.quote_date
+        WHERE excluded.quote_date >= latest_quotes.quote_date;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS latest_quotes_delete AFTER DELETE ON quotes
+    BEGIN
+        DELETE FROM latest_quotes WHERE quote_id = OLD.id;
+        INSERT OR IGNORE INTO latest_quotes (asset_id, quote_id, quote_date)
+        SELECT asset_id, id, quote_date FROM quotes
+        WHERE asset_id = OLD.asset_id
+        ORDER BY quote_date DESC LIMIT 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS latest_quotes_update AFTER UPDATE OF asset_id, quote_date ON quotes
+    BEGIN
+        DELETE FROM latest_quotes WHERE quote_id = OLD.id;
+        INSERT OR IGNORE INTO latest_quotes (asset_id, quote_id, quote_date)
+        SELECT asset_id, id, quote_date FROM quotes
+        WHERE asset_id = OLD.asset_id
+        ORDER BY quote_date DESC LIMIT 1;
+        INSERT INTO latest_quotes (asset_id, quote_id, quote_date)
+        VALUES (NEW.asset_id, NEW.id, NEW.quote_date)
+        ON CONFLICT(asset_id) DO UPDATE SET quote_id = excluded.quote_id, quote_date = excluded.quote_date
+        WHERE excluded.quote_date >= latest_quotes.quote_date;
+    END
+    """,
+)
+
+# Reconstrói o cache a partir de quotes: só na migração que cria os triggers (bancos antigos)
+REFRESH_LATEST_QUOTES = """
+    INSERT OR REPLACE INTO latest_quotes (asset_id, quote_id, quote_date)
+    SELECT asset_id, id, quote_date FROM (
+        SELECT id, asset_id, quote_date,
+               row_number() OVER (PARTITION BY asset_id ORDER BY quote_date DESC) AS rn
+        FROM quotes
+    ) WHERE rn = 1
+"""
+
+# Espera máxima (ms) de um processo pelo init_db de outro (ex.: workers do uvicorn subindo juntos)
+INIT_LOCK_TIMEOUT_MS = 120000
+
 def init_db():
-    """Inicializa o banco de dados criando as tabelas"""
+    """Inicializa o banco de dados criando as tabelas
+    
+    Idempotente e seguro entre processos: tudo roda numa transação BEGIN EXCLUSIVE, então
+    processos que chegam ao mesmo tempo esperam o primeiro migrar e depois não têm nada a fazer.
+    """
     from models import Asset, Quote  # Import aqui para evitar circular import
-    Base.metadata.create_all(bind=engine)
+    from signals import mask_expression
+    
+    # AUTOCOMMIT: o pysqlite não abre transações por conta própria, BEGIN/COMMIT são explícitos
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"PRAGMA busy_timeout = {INIT_LOCK_TIMEOUT_MS}"))
+        conn.execute(text("BEGIN EXCLUSIVE"))
+        try:
+            # Sem o trigger de INSERT, latest_quotes ainda não reflete quotes (tabela nova ou banco antigo)
+            needs_refresh = not has_trigger("latest_quotes_insert", conn)
+            Base.metadata.create_all(bind=conn)
+            migrate_db(conn)
+            
+            # Preenche colunas derivadas de linhas salvas antes de elas existirem
+            conn.execute(
+                Asset.__table__.update()
+                .where(Asset.display_ticker.is_(None))
+                .values(display_ticker=func.replace(Asset.ticker, ".SA", ""))
+            )
+            conn.execute(
+                Quote.__table__.update()
+                .where(Quote.signals_mask.is_(None))
+                .values(signals_mask=mask_expression(Quote))
+            )
+            for trigger in LATEST_QUOTES_TRIGGERS:
+                conn.execute(text(trigger))
+            if needs_refresh:
+                conn.execute(text(REFRESH_LATEST_QUOTES))
+            conn.execute(text("COMMIT"))
+        except Exception:
+            conn.execute(text("ROLLBACK"))
+            raise
+        finally:
+            # Conexão volta ao pool com o timeout padrão do pysqlite (5s)
+            conn.execute(text("PRAGMA busy_timeout = 5000"))
     print("✅ Banco de dados inicializado!")
+
+def has_trigger(name: str, conn=None) -> bool:
+    """Indica se o trigger já existe no banco (na conexão conn, se fornecida)"""
+    query = text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name")
+    if conn is not None:
+        return conn.execute(query, {"name": name}).first() is not None
+    with engine.connect() as conn:
+        return conn.execute(query, {"name": name}).first() is not None
+
+def migrate_db(conn):
+    """Adiciona colunas e índices novos dos modelos em bancos já existentes (na transação de init_db)"""
+    # create_all não altera tabelas existentes
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+                print(f"🔧 Coluna adicionada: {table.name}.{column.name}")
+    
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
@@ -1,44 +1,337 @@
 """
-Módulo para exportar dados para CSV e JSON
+Módulo para exportar dados para CSV, JSON e Parquet
 """
 import os
+import sys
 import json
 import csv
+import heapq
+import io
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime, date
-from typing import Optional
-from sqlalchemy import func
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+from typing import List, Optional
+from sqlalchemy import bindparam, select
 
 from database import SessionLocal
-from models import Asset, Quote
+from models import Asset, LatestQuote, Quote
+
+# orjson: serialização JSON em Rust (fallback para json da stdlib)
+try:
+    import orjson
+except Exception as e:
+    print(f"⚠️ orjson not available: {e}")
+    orjson = None
+
+# pyarrow: exportação colunar em Parquet (opcional)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception as e:
+    print(f"⚠️ pyarrow not available: {e}")
+    pa = None
+    pq = None
 
 
 EXPORTS_PATH = os.environ.get("EXPORTS_PATH", "/app/exports")
 
+# Buffer de escrita dos exports (1 MiB: bem menos syscalls write que o padrão de 8 KiB)
+WRITE_BUFFER_SIZE = 1024 * 1024
 
-def get_latest_quotes(db, quote_date: Optional[date] = None):
+# EXPORT_COMPRESSION=zstd grava os exports CSV/JSON comprimidos (arquivos .zst)
+EXPORT_COMPRESSION = os.environ.get("EXPORT_COMPRESSION", "").lower()
+
+zstd = None
+if EXPORT_COMPRESSION == "zstd":
+    try:
+        import zstandard as zstd
+    except Exception as e:
+        print(f"⚠️ zstandard not available: {e}")
+
+
+# EXPORT_FORMATS=columns,ndjson grava também os formatos opcionais (separados por vírgula) em export_all
+EXPORT_FORMATS = [name.strip() for name in os.environ.get("EXPORT_FORMATS", "").lower().split(",") if name.strip()]
+
+
+# Formatos de data dos nomes de arquivo e carimbos dos exports
+DATE_FORMAT = "%Y-%m-%d"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def export_date(quote_date: Optional[date] = None) -> str:
+    """Data usada nos nomes de arquivo: quote_date ou hoje"""
+    return (quote_date or datetime.now()).strftime(DATE_FORMAT)
+
+
+def export_filepath(filename: str) -> str:
+    """Caminho do arquivo de export (com sufixo .zst quando comprimido)"""
+    filepath = os.path.join(EXPORTS_PATH, filename)
+    return filepath + ".zst" if zstd is not None else filepath
+
+
+@contextmanager
+def atomic_write(filepath: str):
     """
-    Obtém as cotações mais recentes de todos os ativos
+    Caminho temporário (filepath + ".tmp") para gravar o arquivo
+    Só substitui filepath (os.replace) se o bloco terminar sem erro: leitores nunca veem arquivo pela metade
+    """
+    tmp_path = filepath + ".tmp"
+    try:
+        yield tmp_path
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, filepath)
+
+
+@contextmanager
+def open_export(filepath: str, binary: bool = False, newline: Optional[str] = None):
+    """Abre um arquivo de export para escrita (atômica), comprimindo com zstd se habilitado"""
+    with atomic_write(filepath) as tmp_path:
+        if zstd is None:
+            if binary:
+                with open(tmp_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+                    yield f
+            else:
+                with open(tmp_path, 'w', newline=newline, encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+                    yield f
+        else:
+            # Nível 3 com threads=-1: a compressão roda em threads do zstd, fora do loop de formatação
+            compressor = zstd.ZstdCompressor(level=3, threads=-1)
+            with open(tmp_path, 'wb') as raw, compressor.stream_writer(raw, closefd=False) as z:
+                if binary:
+                    yield z
+                else:
+                    f = io.TextIOWrapper(z, encoding='utf-8', newline=newline)
+                    try:
+                        yield f
+                    finally:
+                        f.flush()
+                        f.detach()
+
+
+def json_dumps_indented(obj, default=None) -> bytes:
+    """
+    Serializa obj como JSON indentado (2 espaços), em UTF-8
+    default converte tipos não suportados (inclusive datetime/date, como no json.dump(default=...))
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        if default is not None:
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2, default=default).encode('utf-8')
+
+
+def write_json(filepath: str, data) -> None:
+    """Grava data como JSON indentado (2 espaços, UTF-8)"""
+    if orjson is not None:
+        with open_export(filepath, binary=True) as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open_export(filepath) as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def write_json_array(filepath: str, envelope: dict, key: str, items, default=None) -> None:
+    """
+    Grava {**envelope, key: items} no mesmo formato de write_json, serializando um item por vez
+    O documento inteiro nunca é montado em memória; items pode ser qualquer iterável.
+    """
+    with open_export(filepath, binary=True) as f:
+        f.write(b"{\n")
+        for k, v in envelope.items():
+            f.write(b"  " + json_dumps_indented(k) + b": " + json_dumps_indented(v, default).replace(b"\n", b"\n  ") + b",\n")
+        f.write(b"  " + json_dumps_indented(key) + b": [")
+        
+        # Itens no nível 2 de indentação (4 espaços); strings JSON não têm quebras de linha literais
+        sep = b"\n    "
+        empty = True
+        for item in items:
+            f.write(sep + json_dumps_indented(item, default).replace(b"\n", b"\n    "))
+            sep = b",\n    "
+            empty = False
+        f.write(b"]\n}" if empty else b"\n  ]\n}")
+
+
+def json_line(obj) -> bytes:
+    """Serializa obj como uma linha JSON compacta (NDJSON), em UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode('utf-8')
+
+
+@lru_cache(maxsize=None)
+def quotes_statement(dated: bool):
+    """
+    SELECT das cotações exportadas, montado uma vez por formato (data fixa ou mais recentes)
+    dated=True filtra pelo bindparam "quote_date"; reusar o mesmo objeto aproveita o cache de compilação.
+    """
+    # Colunas Core da tabela direto, sem adaptar atributos ORM coluna a coluna
+    quotes = Quote.__table__
+    columns = [
+        Asset.display_ticker, Asset.name, Asset.sector, Asset.asset_type, quotes.c.price_brl,
+        *(quotes.c[attr] for _, attr, _ in EXPORT_FIELDS),
+        quotes.c.quote_date, quotes.c.fetched_at,
+    ]
+    stmt = select(*columns).select_from(quotes).join(Asset, Asset.id == quotes.c.asset_id)
+    
+    if dated:
+        stmt = stmt.where(quotes.c.quote_date == bindparam("quote_date"))
+    else:
+        # Última cotação de cada ativo lida do cache latest_quotes (uma linha por ativo)
+        stmt = stmt.join(LatestQuote, LatestQuote.quote_id == quotes.c.id)
+    
+    return stmt.order_by(Asset.sector, Asset.display_ticker)
+
+
+def query_latest_quotes(db, quote_date: Optional[date] = None, yield_per: Optional[int] = None):
+    """
+    Cotações mais recentes de todos os ativos, ordenadas por setor e ticker
     Se quote_date for fornecido, busca cotações dessa data específica
+    
+    Retorna o Result com tuplas (Row) das colunas lidas por format_quote_row, sem objetos ORM.
+    Com yield_per, as linhas saem do cursor em lotes desse tamanho.
     """
+    options = {"yield_per": yield_per} if yield_per else {}
     if quote_date:
         target_date = datetime.combine(quote_date, datetime.min.time())
-        quotes = db.query(Quote).join(Asset).filter(
-            Quote.quote_date == target_date
-        ).all()
-    else:
-        # Subquery para pegar a última cotação de cada ativo
-        subquery = db.query(
-            Quote.asset_id,
-            func.max(Quote.quote_date).label('max_date')
-        ).group_by(Quote.asset_id).subquery()
-        
-        quotes = db.query(Quote).join(
-            subquery,
-            (Quote.asset_id == subquery.c.asset_id) & 
-            (Quote.quote_date == subquery.c.max_date)
-        ).all()
+        return db.execute(quotes_statement(True), {"quote_date": target_date}, execution_options=options)
+    return db.execute(quotes_statement(False), execution_options=options)
+
+
+def get_latest_quotes(db, quote_date: Optional[date] = None):
+    """
+    Obtém as cotações mais recentes de todos os ativos
+    Se quote_date for fornecido, busca cotações dessa data específica
+    """
+    return query_latest_quotes(db, quote_date).all()
+
+
+@contextmanager
+def report_session():
+    """Sessão compartilhada por uma sequência de consultas de exportação/relatório"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_quote_rows(quote_date: Optional[date] = None, db=None) -> List[dict]:
+    """
+    Linhas formatadas (format_quote_row) das cotações mais recentes
+    Calculadas uma vez e repassadas via rows= para exportações e resumos em sequência
+    Sem db, abre (e fecha) uma sessão própria.
+    """
+    if db is not None:
+        return [format_quote_row(q) for q in get_latest_quotes(db, quote_date)]
     
-    return quotes
+    with report_session() as db:
+        return [format_quote_row(q) for q in get_latest_quotes(db, quote_date)]
+
+
+# Cores ANSI dos terminais
+ANSI_GREEN = "\033[92m"
+ANSI_RED = "\033[91m"
+ANSI_YELLOW = "\033[93m"
+ANSI_RESET = "\033[0m"
+
+# Templates coloridos montados uma vez (str.format ligado), usados célula a célula pelos printers
+_PCT_UP = (ANSI_GREEN + "{:>+7.1f}%" + ANSI_RESET).format
+_PCT_DOWN = (ANSI_RED + "{:>+7.1f}%" + ANSI_RESET).format
+_RSI_HIGH = (ANSI_RED + "{:>5.0f}" + ANSI_RESET).format
+_RSI_LOW = (ANSI_GREEN + "{:>5.0f}" + ANSI_RESET).format
+_RSI_MID = ("{:>5.0f}" + ANSI_RESET).format
+_SCORE_UP = (ANSI_GREEN + "{:>+.2f}" + ANSI_RESET).format
+_SCORE_DOWN = (ANSI_RED + "{:>+.2f}" + ANSI_RESET).format
+_SCORE_MID = (ANSI_YELLOW + "{:>+.2f}" + ANSI_RESET).format
+
+# Tabelas indexadas pelas comparações (bool soma como 0/1): sem if/else por célula
+_PCT_FMT = (_PCT_DOWN, _PCT_UP)                # [val >= 0]
+_RSI_FMT = (_RSI_LOW, _RSI_MID, _RSI_HIGH)     # [(val >= 30) + (val > 70)]
+_SCORE_FMT = (_SCORE_DOWN, _SCORE_MID, _SCORE_UP)  # [(score > -0.2) + (score >= 0.2)]
+
+# Células fixas de rating e signal_summary (texto e cor só dependem do valor)
+_RATING_CELLS = {
+    rating: f"{color}{rating:>7}{ANSI_RESET}"
+    for rating, color in (
+        ("buy", ANSI_GREEN), ("strong_buy", ANSI_GREEN), ("hold", ANSI_YELLOW),
+        ("sell", ANSI_RED), ("strong_sell", ANSI_RED),
+    )
+}
+_SIGNAL_CELLS = {
+    "bullish": f"{ANSI_GREEN}📈bull{ANSI_RESET}",
+    "bearish": f"{ANSI_RED}📉bear{ANSI_RESET}",
+    "neutral": f"{ANSI_YELLOW}➖neut{ANSI_RESET}",
+}
+
+
+def color_change(val: Optional[float]) -> str:
+    """Variação percentual colorida, com largura fixa de 8 caracteres (sinal + número + %)"""
+    # Zero aparece como N/A nos printers (as linhas exportadas mantêm o 0.0)
+    if not val:
+        return "     N/A"
+    return _PCT_FMT[val >= 0](val)
+
+
+def format_pct(val: Optional[float], invert: bool = False) -> str:
+    """Como color_change; invert=True pinta de verde os valores negativos"""
+    if not val:
+        return "     N/A"
+    return _PCT_FMT[(val >= 0) != invert](val)
+
+
+def format_rsi(val: Optional[float]) -> str:
+    """RSI colorido: vermelho acima de 70, verde abaixo de 30"""
+    if not val:
+        return "   N/A"
+    return _RSI_FMT[(val >= 30) + (val > 70)](val)
+
+
+def format_rating(rating: Optional[str]) -> str:
+    """Recomendação dos analistas colorida (buy/hold/sell)"""
+    if not rating:
+        return "    N/A"
+    cell = _RATING_CELLS.get(rating)
+    return cell if cell is not None else f"{rating:>7}{ANSI_RESET}"
+
+
+def format_signal(summary: Optional[str]) -> str:
+    """signal_summary com ícone e cor (bullish/bearish/neutral)"""
+    if not summary:
+        return "  N/A  "
+    cell = _SIGNAL_CELLS.get(summary)
+    return cell if cell is not None else f"{summary[:4]:>4}{ANSI_RESET}"
+
+
+def format_score(score: Optional[float]) -> str:
+    """Score de sentimento colorido (limiar de ±0.2)"""
+    if not score:
+        return "  N/A"
+    return _SCORE_FMT[(score > -0.2) + (score >= 0.2)](score)
+
+
+def pick_headline(row: dict) -> str:
+    """Manchete exibida para uma ação: a PT-BR, senão a em inglês ("" se nenhuma)"""
+    return row.get('news_headline_pt') or row.get('news_headline_en') or ""
+
+
+def truncate(text: Optional[str], max_len: int = 50) -> str:
+    """Corta o texto em max_len caracteres, com reticências"""
+    if not text:
+        return ""
+    return text[:max_len] + "..." if len(text) > max_len else text
+
+
+# Linha de ativo do print_summary: template compilado uma vez, variações lidas de uma vez
+format_summary_row = "{:<10} {:<20} {:>12,.2f} {} {} {} {} {} {} {}".format
+get_summary_changes = itemgetter("var_1d", "var_1w", "var_1m", "var_ytd", "var_5y", "var_all")
+get_sector = itemgetter("setor")
 
 
 def format_change(value: Optional[float]) -> str:
@@ -49,849 +342,1035 @@ def format_change(value: Optional[float]) -> str:
     return f"{sign}{value:.2f}%"
 
 
-def format_quote_row(quote: Quote) -> dict:
-    """Formata uma cotação para exportação"""
-    return {
-        "ticker": quote.asset.ticker.replace(".SA", ""),
-        "nome": quote.asset.name,
-        "setor": quote.asset.sector,
-        "tipo": quote.asset.asset_type,
-        "preco_brl": round(quote.price_brl, 2),
-        "preco_usd": round(quote.price_usd, 2) if quote.price_usd else None,
-        "abertura": round(quote.open_price, 2) if quote.open_price else None,
-        "maxima": round(quote.high_price, 2) if quote.high_price else None,
-        "minima": round(quote.low_price, 2) if quote.low_price else None,
-        "volume": quote.volume,
-        # Variações históricas
-        "var_1d": round(quote.change_1d, 2) if quote.change_1d else None,
-        "var_1w": round(quote.change_1w, 2) if quote.change_1w else None,
-        "var_1m": round(quote.change_1m, 2) if quote.change_1m else None,
-        "var_ytd": round(quote.change_ytd, 2) if quote.change_ytd else None,
-        "var_5y": round(quote.change_5y, 2) if quote.change_5y else None,
-        "var_all": round(quote.change_all, 2) if quote.change_all else None,
-        # Preços históricos
-        "preco_1d_ago": round(quote.price_1d_ago, 2) if quote.price_1d_ago else None,
-        "preco_1w_ago": round(quote.price_1w_ago, 2) if quote.price_1w_ago else None,
-        "preco_1m_ago": round(quote.price_1m_ago, 2) if quote.price_1m_ago else None,
-        "preco_inicio_ano": round(quote.price_ytd, 2) if quote.price_ytd else None,
-        "preco_5y_ago": round(quote.price_5y_ago, 2) if quote.price_5y_ago else None,
-        "preco_all_time": round(quote.price_all_time, 2) if quote.price_all_time else None,
-        # Fundamental data
-        "market_cap": quote.market_cap,
-        "pe_ratio": round(quote.pe_ratio, 2) if quote.pe_ratio else None,
-        "forward_pe": round(quote.forward_pe, 2) if quote.forward_pe else None,
-        "pb_ratio": round(quote.pb_ratio, 2) if quote.pb_ratio else None,
-        "dividend_yield": round(quote.dividend_yield, 2) if quote.dividend_yield else None,
-        "eps": round(quote.eps, 2) if quote.eps else None,
-        # Risk metrics
-        "beta": round(quote.beta, 2) if quote.beta else None,
-        "week_52_high": round(quote.week_52_high, 2) if quote.week_52_high else None,
-        "week_52_low": round(quote.week_52_low, 2) if quote.week_52_low else None,
-        "pct_from_52w_high": round(quote.pct_from_52w_high, 2) if quote.pct_from_52w_high else None,
-        # Technical indicators
-        "ma_50": round(quote.ma_50, 2) if quote.ma_50 else None,
-        "ma_200": round(quote.ma_200, 2) if quote.ma_200 else None,
-        "rsi_14": round(quote.rsi_14, 1) if quote.rsi_14 else None,
-        "above_ma_50": quote.above_ma_50,
-        "above_ma_200": quote.above_ma_200,
-        "ma_50_above_200": quote.ma_50_above_200,
-        # Financial health
-        "profit_margin": round(quote.profit_margin, 2) if quote.profit_margin else None,
-        "roe": round(quote.roe, 2) if quote.roe else None,
-        "debt_to_equity": round(quote.debt_to_equity, 2) if quote.debt_to_equity else None,
-        # Analyst data
-        "analyst_rating": quote.analyst_rating,
-        "target_price": round(quote.target_price, 2) if quote.target_price else None,
-        "num_analysts": quote.num_analysts,
-        # Benchmark comparison
-        "ibov_change_1d": round(quote.ibov_change_1d, 2) if quote.ibov_change_1d else None,
-        "ibov_change_ytd": round(quote.ibov_change_ytd, 2) if quote.ibov_change_ytd else None,
-        "sp500_change_1d": round(quote.sp500_change_1d, 2) if quote.sp500_change_1d else None,
-        "sp500_change_ytd": round(quote.sp500_change_ytd, 2) if quote.sp500_change_ytd else None,
-        "vs_ibov_1d": round(quote.vs_ibov_1d, 2) if quote.vs_ibov_1d else None,
-        "vs_ibov_1m": round(quote.vs_ibov_1m, 2) if quote.vs_ibov_1m else None,
-        "vs_ibov_ytd": round(quote.vs_ibov_ytd, 2) if quote.vs_ibov_ytd else None,
-        "vs_sp500_1d": round(quote.vs_sp500_1d, 2) if quote.vs_sp500_1d else None,
-        "vs_sp500_1m": round(quote.vs_sp500_1m, 2) if quote.vs_sp500_1m else None,
-        "vs_sp500_ytd": round(quote.vs_sp500_ytd, 2) if quote.vs_sp500_ytd else None,
-        # Trading signals
-        "signal_golden_cross": quote.signal_golden_cross,
-        "signal_death_cross": quote.signal_death_cross,
-        "signal_rsi_oversold": quote.signal_rsi_oversold,
-        "signal_rsi_overbought": quote.signal_rsi_overbought,
-        "signal_52w_high": quote.signal_52w_high,
-        "signal_52w_low": quote.signal_52w_low,
-        "signal_volume_spike": quote.signal_volume_spike,
-        "signal_summary": quote.signal_summary,
-        # Volatility
-        "volatility_30d": round(quote.volatility_30d, 2) if quote.volatility_30d else None,
-        "avg_volume_20d": quote.avg_volume_20d,
-        "volume_ratio": round(quote.volume_ratio, 2) if quote.volume_ratio else None,
-        # News sentiment
-        "news_sentiment_pt": round(quote.news_sentiment_pt, 3) if quote.news_sentiment_pt else None,
-        "news_sentiment_en": round(quote.news_sentiment_en, 3) if quote.news_sentiment_en else None,
-        "news_sentiment_combined": round(quote.news_sentiment_combined, 3) if quote.news_sentiment_combined else None,
-        "news_count_pt": quote.news_count_pt,
-        "news_count_en": quote.news_count_en,
-        "news_headline_pt": quote.news_headline_pt,
-        "news_headline_en": quote.news_headline_en,
-        "news_sentiment_label": quote.news_sentiment_label,
-        "data_cotacao": quote.quote_date.strftime("%Y-%m-%d"),
-        "atualizado_em": quote.fetched_at.strftime("%Y-%m-%d %H:%M:%S")
+# Campos da cotação exportados após preco_brl, na ordem do CSV:
+# (chave, atributo de Quote, casas decimais; None = valor sem arredondar)
+EXPORT_FIELDS = (
+    ("preco_usd", "price_usd", 2),
+    ("abertura", "open_price", 2),
+    ("maxima", "high_price", 2),
+    ("minima", "low_price", 2),
+    ("volume", "volume", None),
+    # Variações históricas
+    ("var_1d", "change_1d", 2),
+    ("var_1w", "change_1w", 2),
+    ("var_1m", "change_1m", 2),
+    ("var_ytd", "change_ytd", 2),
+    ("var_5y", "change_5y", 2),
+    ("var_all", "change_all", 2),
+    # Preços históricos
+    ("preco_1d_ago", "price_1d_ago", 2),
+    ("preco_1w_ago", "price_1w_ago", 2),
+    ("preco_1m_ago", "price_1m_ago", 2),
+    ("preco_inicio_ano", "price_ytd", 2),
+    ("preco_5y_ago", "price_5y_ago", 2),
+    ("preco_all_time", "price_all_time", 2),
+    # Fundamental data
+    ("market_cap", "market_cap", None),
+    ("pe_ratio", "pe_ratio", 2),
+    ("forward_pe", "forward_pe", 2),
+    ("pb_ratio", "pb_ratio", 2),
+    ("dividend_yield", "dividend_yield", 2),
+    ("eps", "eps", 2),
+    # Risk metrics
+    ("beta", "beta", 2),
+    ("week_52_high", "week_52_high", 2),
+    ("week_52_low", "week_52_low", 2),
+    ("pct_from_52w_high", "pct_from_52w_high", 2),
+    # Technical indicators
+    ("ma_50", "ma_50", 2),
+    ("ma_200", "ma_200", 2),
+    ("rsi_14", "rsi_14", 1),
+    ("above_ma_50", "above_ma_50", None),
+    ("above_ma_200", "above_ma_200", None),
+    ("ma_50_above_200", "ma_50_above_200", None),
+    # Financial health
+    ("profit_margin", "profit_margin", 2),
+    ("roe", "roe", 2),
+    ("debt_to_equity", "debt_to_equity", 2),
+    # Analyst data
+    ("analyst_rating", "analyst_rating", None),
+    ("target_price", "target_price", 2),
+    ("num_analysts", "num_analysts", None),
+    # Benchmark comparison
+    ("ibov_change_1d", "ibov_change_1d", 2),
+    ("ibov_change_ytd", "ibov_change_ytd", 2),
+    ("sp500_change_1d", "sp500_change_1d", 2),
+    ("sp500_change_ytd", "sp500_change_ytd", 2),
+    ("vs_ibov_1d", "vs_ibov_1d", 2),
+    ("vs_ibov_1m", "vs_ibov_1m", 2),
+    ("vs_ibov_ytd", "vs_ibov_ytd", 2),
+    ("vs_sp500_1d", "vs_sp500_1d", 2),
+    ("vs_sp500_1m", "vs_sp500_1m", 2),
+    ("vs_sp500_ytd", "vs_sp500_ytd", 2),
+    # Trading signals
+    ("signal_golden_cross", "signal_golden_cross", None),
+    ("signal_death_cross", "signal_death_cross", None),
+    ("signal_rsi_oversold", "signal_rsi_oversold", None),
+    ("signal_rsi_overbought", "signal_rsi_overbought", None),
+    ("signal_52w_high", "signal_52w_high", None),
+    ("signal_52w_low", "signal_52w_low", None),
+    ("signal_volume_spike", "signal_volume_spike", None),
+    ("signal_summary", "signal_summary", None),
+    # Volatility
+    ("volatility_30d", "volatility_30d", 2),
+    ("avg_volume_20d", "avg_volume_20d", None),
+    ("volume_ratio", "volume_ratio", 2),
+    # News sentiment
+    ("news_sentiment_pt", "news_sentiment_pt", 3),
+    ("news_sentiment_en", "news_sentiment_en", 3),
+    ("news_sentiment_combined", "news_sentiment_combined", 3),
+    ("news_count_pt", "news_count_pt", None),
+    ("news_count_en", "news_count_en", None),
+    ("news_headline_pt", "news_headline_pt", None),
+    ("news_headline_en", "news_headline_en", None),
+    ("news_sentiment_label", "news_sentiment_label", None),
+)
+_EXPORT_KEYS = tuple(key for key, _, _ in EXPORT_FIELDS)
+_EXPORT_DIGITS = tuple(digits for _, _, digits in EXPORT_FIELDS)
+
+
+# Colunas de format_quote_values / format_quote_row, na ordem do CSV
+EXPORT_COLUMNS = (
+    "ticker", "nome", "setor", "tipo", "preco_brl",
+    *_EXPORT_KEYS,
+    "data_cotacao", "atualizado_em",
+)
+
+
+def format_quote_values(values) -> tuple:
+    """Formata uma cotação (tupla de query_latest_quotes) como tupla na ordem de EXPORT_COLUMNS"""
+    ticker, name, sector, asset_type, price_brl = values[:5]
+    quote_date, fetched_at = values[-2:]
+    return (
+        ticker,
+        name,
+        # Poucos valores distintos: strings internadas são compartilhadas entre as linhas
+        sys.intern(sector),
+        sys.intern(asset_type),
+        round(price_brl, 2),
+        # Um loop para todos os campos da tabela (valores na ordem de EXPORT_FIELDS)
+        *[
+            value if digits is None or value is None else round(value, digits)
+            for value, digits in zip(values[5:-2], _EXPORT_DIGITS)
+        ],
+        # isoformat: mesmo texto de strftime("%Y-%m-%d" / "%Y-%m-%d %H:%M:%S"), sem o parser de formato
+        quote_date.date().isoformat(),
+        fetched_at.isoformat(" ", "seconds"),
+    )
+
+
+def format_quote_row(values) -> dict:
+    """Formata uma cotação (tupla de query_latest_quotes) para exportação"""
+    return dict(zip(EXPORT_COLUMNS, format_quote_values(values)))
+
+
+def format_quote_columns(quotes) -> dict:
+    """
+    Formata cotações (tuplas de query_latest_quotes) por coluna: {chave: [valores]}
+    Mesmas chaves e valores de format_quote_row, sem montar um dict por linha
+    """
+    columns = list(zip(*quotes))
+    if not columns:
+        return {}
+    
+    ticker, name, sector, asset_type, price_brl = columns[:5]
+    quote_date, fetched_at = columns[-2:]
+    data = {
+        "ticker": list(ticker),
+        "nome": list(name),
+        "setor": list(sector),
+        "tipo": list(asset_type),
+        "preco_brl": [round(value, 2) for value in price_brl],
     }
+    for key, digits, values in zip(_EXPORT_KEYS, _EXPORT_DIGITS, columns[5:-2]):
+        if digits is None:
+            data[key] = list(values)
+        else:
+            data[key] = [None if value is None else round(value, digits) for value in values]
+    data["data_cotacao"] = [value.date().isoformat() for value in quote_date]
+    data["atualizado_em"] = [value.isoformat(" ", "seconds") for value in fetched_at]
+    return data
 
 
-def export_to_csv(quote_date: Optional[date] = None, filename: Optional[str] = None) -> str:
+def rows_to_columns(rows: List[dict]) -> dict:
+    """Transpõe linhas de format_quote_row para {chave: [valores]}"""
+    if not rows:
+        return {}
+    return {key: [row[key] for row in rows] for key in rows[0]}
+
+
+def export_to_csv(quote_date: Optional[date] = None, filename: Optional[str] = None,
+                  rows: Optional[List[dict]] = None) -> str:
     """
     Exporta cotações para CSV
     
     Args:
         quote_date: Data específica para exportar (None = mais recentes)
         filename: Nome do arquivo (None = gera automaticamente)
+        rows: Linhas já formatadas (None = consulta o banco)
     
     Returns:
         Caminho do arquivo gerado
     """
-    db = SessionLocal()
-    
-    try:
-        quotes = get_latest_quotes(db, quote_date)
-        
-        if not quotes:
+    with report_session() as db:
+        if rows is None:
+            # Tuplas saem do cursor já ordenadas (setor, ticker), em lotes, sem montar dicts
+            values = map(format_quote_values, query_latest_quotes(db, quote_date, yield_per=1000))
+        else:
+            values = map(dict.values, rows)
+        first = next(values, None)
+        
+        if first is None:
             print("⚠️ Nenhuma cotação encontrada para exportar")
             return None
         
         # Gerar nome do arquivo
         if not filename:
-            date_str = quote_date.strftime("%Y-%m-%d") if quote_date else datetime.now().strftime("%Y-%m-%d")
-            filename = f"cotacoes_{date_str}.csv"
+            filename = f"cotacoes_{export_date(quote_date)}.csv"
         
-        filepath = os.path.join(EXPORTS_PATH, filename)
+        filepath = export_filepath(filename)
         
         # Criar diretório se não existir
         os.makedirs(EXPORTS_PATH, exist_ok=True)
         
-        # Escrever CSV
-        rows = [format_quote_row(q) for q in quotes]
-        
-        # Ordenar por setor e ticker
-        rows.sort(key=lambda x: (x["setor"], x["ticker"]))
-        
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-            writer.writeheader()
-            writer.writerows(rows)
-        
-        print(f"✅ CSV exportado: {filepath} ({len(rows)} registros)")
+        # Escrever CSV linha a linha; os valores já estão na ordem de EXPORT_COLUMNS
+        count = 1
+        with open_export(filepath, newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            writer.writerow(first)
+            for row in values:
+                writer.writerow(row)
+                count += 1
+        
+        print(f"✅ CSV exportado: {filepath} ({count} registros)")
         return filepath
-        
-    finally:
-        db.close()
 
 
-def export_to_json(quote_date: Optional[date] = None, filename: Optional[str] = None) -> str:
+def export_to_json(quote_date: Optional[date] = None, filename: Optional[str] = None,
+                   rows: Optional[List[dict]] = None) -> str:
     """
     Exporta cotações para JSON
     
     Args:
         quote_date: Data específica para exportar (None = mais recentes)
         filename: Nome do arquivo (None = gera automaticamente)
+        rows: Linhas já formatadas (None = consulta o banco)
     
     Returns:
         Caminho do arquivo gerado
     """
-    db = SessionLocal()
+    if rows is None:
+        rows = get_quote_rows(quote_date)
     
-    try:
-        quotes = get_latest_quotes(db, quote_date)
+    if not rows:
+        print("⚠️ Nenhuma cotação encontrada para exportar")
+        return None
+    
+    # Gerar nome do arquivo
+    if not filename:
+        filename = f"cotacoes_{export_date(quote_date)}.json"
+    
+    filepath = export_filepath(filename)
+    
+    # Criar diretório se não existir
+    os.makedirs(EXPORTS_PATH, exist_ok=True)
+    
+    # Cabeçalho + cotações serializadas uma a uma
+    envelope = {
+        "data_exportacao": datetime.now().strftime(TIMESTAMP_FORMAT),
+        "total_ativos": len(rows),
+    }
+    
+    write_json_array(filepath, envelope, "cotacoes", rows)
+    
+    print(f"✅ JSON exportado: {filepath} ({len(rows)} registros)")
+    return filepath
+
+
+def export_to_ndjson(quote_date: Optional[date] = None, filename: Optional[str] = None,
+                     rows: Optional[List[dict]] = None) -> str:
+    """
+    Exporta cotações para NDJSON (um objeto JSON por linha), escrito conforme as linhas saem do banco
+    
+    Args:
+        quote_date: Data específica para exportar (None = mais recentes)
+        filename: Nome do arquivo (None = gera automaticamente)
+        rows: Linhas já formatadas (None = consulta o banco)
+    
+    Returns:
+        Caminho do arquivo gerado
+    """
+    with report_session() as db:
+        if rows is None:
+            rows = map(format_quote_row, query_latest_quotes(db, quote_date, yield_per=1000))
+        rows = iter(rows)
+        first = next(rows, None)
         
-        if not quotes:
+        if first is None:
             print("⚠️ Nenhuma cotação encontrada para exportar")
             return None
         
         # Gerar nome do arquivo
         if not filename:
-            date_str = quote_date.strftime("%Y-%m-%d") if quote_date else datetime.now().strftime("%Y-%m-%d")
-            filename = f"cotacoes_{date_str}.json"
+            filename = f"cotacoes_{export_date(quote_date)}.ndjson"
         
-        filepath = os.path.join(EXPORTS_PATH, filename)
+        filepath = export_filepath(filename)
         
         # Criar diretório se não existir
         os.makedirs(EXPORTS_PATH, exist_ok=True)
         
-        # Preparar dados
-        rows = [format_quote_row(q) for q in quotes]
-        rows.sort(key=lambda x: (x["setor"], x["ticker"]))
-        
-        data = {
-            "data_exportacao": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "total_ativos": len(rows),
-            "cotacoes": rows
-        }
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        count = 1
+        with open_export(filepath, binary=True) as f:
+            f.write(json_line(first))
+            for row in rows:
+                f.write(json_line(row))
+                count += 1
         
-        print(f"✅ JSON exportado: {filepath} ({len(rows)} registros)")
+        print(f"✅ NDJSON exportado: {filepath} ({count} registros)")
         return filepath
-        
-    finally:
-        db.close()
-
-
-def print_summary():
-    """Imprime um resumo das cotações mais recentes com variações"""
-    db = SessionLocal()
-    
-    try:
-        quotes = get_latest_quotes(db)
-        
-        if not quotes:
-            print("⚠️ Nenhuma cotação encontrada")
-            return
-        
-        rows = [format_quote_row(q) for q in quotes]
-        
-        # Formatar variações com cores ANSI e alinhamento correto
-        def color_change(val):
-            if val is None:
-                return "     N/A"
-            # Formato fixo de 8 caracteres: sinal + número + %
-            color = "\033[92m" if val >= 0 else "\033[91m"  # Verde/Vermelho
-            reset = "\033[0m"
-            if val >= 0:
-                return f"{color}{val:>+7.1f}%{reset}"
-            else:
-                return f"{color}{val:>7.1f}%{reset}"
-        
-        def print_section(title, section_rows):
-            """Imprime uma seção de ativos"""
-            if not section_rows:
-                return
-            
-            print(f"\n{'='*140}")
-            print(f"  {title}")
-            print(f"{'='*140}")
-            print(f"{'TICKER':<10} {'NOME':<20} {'BRL':>12} {'USD':>10} {'1D':>8} {'1W':>8} {'1M':>8} {'YTD':>8} {'5Y':>8} {'ALL':>8}")
-            print("-"*140)
-            
-            current_sector = None
-            for row in section_rows:
-                if row["setor"] != current_sector:
-                    current_sector = row["setor"]
-                    print(f"\n--- {current_sector.upper()} ---")
-                
-                usd_str = f"{row['preco_usd']:>10.2f}" if row['preco_usd'] else "       N/A"
-                
-                print(f"{row['ticker']:<10} {row['nome'][:19]:<20} {row['preco_brl']:>12,.2f} {usd_str} "
-                      f"{color_change(row['var_1d'])} {color_change(row['var_1w'])} "
-                      f"{color_change(row['var_1m'])} {color_change(row['var_ytd'])} "
-                      f"{color_change(row['var_5y'])} {color_change(row['var_all'])}")
-        
-        # Separar por tipo de ativo
-        br_stocks = [r for r in rows if r["tipo"] == "stock"]
-        us_stocks = [r for r in rows if r["tipo"] == "us_stock"]
-        commodities = [r for r in rows if r["tipo"] == "commodity"]
-        crypto = [r for r in rows if r["tipo"] == "crypto"]
-        currency = [r for r in rows if r["tipo"] == "currency"]
-        
-        # Ordenar cada seção por setor e ticker
-        for section in [br_stocks, us_stocks, commodities, crypto, currency]:
-            section.sort(key=lambda x: (x["setor"], x["ticker"]))
-        
-        # Imprimir cada seção
-        print_section("🇧🇷 AÇÕES BRASILEIRAS (B3)", br_stocks)
-        print_section("🇺🇸 AÇÕES AMERICANAS (NYSE/NASDAQ)", us_stocks)
-        print_section("🥇 COMMODITIES", commodities)
-        print_section("₿ CRIPTOMOEDAS", crypto)
-        print_section("💱 CÂMBIO", currency)
-        
-        print(f"\n{'='*140}")
-        print(f"Total de ativos: {len(rows)} | 🇧🇷 Brasil: {len(br_stocks)} | 🇺🇸 EUA: {len(us_stocks)} | "
-              f"Commodities: {len(commodities)} | Crypto: {len(crypto)}")
-        print("Legenda: 1D = Dia anterior | 1W = 1 semana | 1M = 1 mês | YTD = Ano até a data | 5Y = 5 anos | ALL = Desde o início")
-        print("="*140 + "\n")
-        
-    finally:
-        db.close()
 
 
-def print_ai_analysis():
-    """Imprime análise detalhada com dados fundamentais para AI"""
-    db = SessionLocal()
+def export_to_json_columns(quote_date: Optional[date] = None, filename: Optional[str] = None,
+                           rows: Optional[List[dict]] = None) -> str:
+    """
+    Exporta cotações para JSON colunar ({"colunas": {chave: [valores]}})
+    Cada chave aparece uma vez, não uma vez por ativo: arquivo menor e serialização mais rápida
     
-    try:
-        quotes = get_latest_quotes(db)
-        
-        if not quotes:
-            print("⚠️ Nenhuma cotação encontrada")
-            return
-        
-        rows = [format_quote_row(q) for q in quotes]
-        
-        def format_rating(rating):
-            if not rating:
-                return "    N/A"
-            colors = {"buy": "\033[92m", "strong_buy": "\033[92m", 
-                      "hold": "\033[93m", "sell": "\033[91m", "strong_sell": "\033[91m"}
-            color = colors.get(rating, "")
-            return f"{color}{rating:>7}\033[0m"
-        
-        def format_rsi(val):
-            if val is None:
-                return "   N/A"
-            color = "\033[91m" if val > 70 else ("\033[92m" if val < 30 else "")
-            return f"{color}{val:>5.0f}\033[0m"
-        
-        def format_pct(val, invert=False):
-            if val is None:
-                return "     N/A"
-            color = "\033[92m" if (val >= 0) != invert else "\033[91m"
-            return f"{color}{val:>+7.1f}%\033[0m"
-        
-        def format_signal(summary):
-            if not summary:
-                return "  N/A  "
-            colors = {"bullish": "\033[92m", "bearish": "\033[91m", "neutral": "\033[93m"}
-            emoji = {"bullish": "📈", "bearish": "📉", "neutral": "➖"}
-            color = colors.get(summary, "")
-            icon = emoji.get(summary, "")
-            return f"{color}{icon}{summary[:4]:>4}\033[0m"
-        
-        print(f"\n{'='*180}")
-        print("  🤖 AI INVESTMENT ANALYSIS - FUNDAMENTAL & TECHNICAL DATA")
-        print(f"{'='*180}")
-        print(f"{'TICKER':<8} {'NOME':<16} {'P/E':>7} {'BETA':>5} {'RSI':>5} {'vs52H':>8} {'vsIBOV':>8} {'vsSP500':>8} {'SIGNAL':>8} {'MA50':>5} {'MA200':>5} {'RATING':>8} {'VOL30D':>7}")
-        print("-"*180)
-        
-        # Only show stocks (not commodities/crypto)
-        stocks = [r for r in rows if r["tipo"] in ("stock", "us_stock")]
-        stocks.sort(key=lambda x: (x["tipo"], x["setor"], x["ticker"]))
-        
-        current_type = None
-        for row in stocks:
-            if row["tipo"] != current_type:
-                current_type = row["tipo"]
-                label = "🇧🇷 BRAZIL" if current_type == "stock" else "🇺🇸 USA"
-                print(f"\n{'='*40} {label} {'='*40}")
-            
-            pe = f"{row['pe_ratio']:>7.1f}" if row['pe_ratio'] else "    N/A"
-            beta = f"{row['beta']:>5.2f}" if row['beta'] else "  N/A"
-            ma50 = "  ✓" if row['above_ma_50'] == 1 else ("  ✗" if row['above_ma_50'] == 0 else " N/A")
-            ma200 = "  ✓" if row['above_ma_200'] == 1 else ("  ✗" if row['above_ma_200'] == 0 else " N/A")
-            vol30d = f"{row['volatility_30d']:>6.2f}%" if row['volatility_30d'] else "    N/A"
-            
-            # Use vs_ibov_ytd for Brazil, vs_sp500_ytd for US
-            if row["tipo"] == "stock":
-                vs_bench = format_pct(row['vs_ibov_ytd'])
-            else:
-                vs_bench = format_pct(row['vs_sp500_ytd'])
-            
-            print(f"{row['ticker']:<8} {row['nome'][:15]:<16} {pe} {beta} "
-                  f"{format_rsi(row['rsi_14'])} {format_pct(row['pct_from_52w_high'], invert=True)} "
-                  f"{format_pct(row['vs_ibov_ytd'])} {format_pct(row['vs_sp500_ytd'])} "
-                  f"{format_signal(row['signal_summary'])} {ma50} {ma200} {format_rating(row['analyst_rating'])} {vol30d}")
-        
-        print(f"\n{'='*180}")
-        print("Legend: vsIBOV/vsSP500 = YTD outperformance vs benchmark | SIGNAL = AI-detected signal (bullish/bearish/neutral)")
-        print("        VOL30D = 30-day volatility | RSI = 14-day RSI (>70 overbought, <30 oversold) | vs52H = % from 52-week high")
-        print("="*180 + "\n")
-        
-    finally:
-        db.close()
-
-
-def print_signals():
-    """Imprime sinais de trading detectados"""
-    db = SessionLocal()
+    Args:
+        quote_date: Data específica para exportar (None = mais recentes)
+        filename: Nome do arquivo (None = gera automaticamente)
+        rows: Linhas já formatadas (None = consulta o banco)
     
-    try:
-        quotes = get_latest_quotes(db)
+    Returns:
+        Caminho do arquivo gerado
+    """
+    with report_session() as db:
+        if rows is None:
+            columns = format_quote_columns(query_latest_quotes(db, quote_date).all())
+        else:
+            columns = rows_to_columns(rows)
         
-        if not quotes:
-            print("⚠️ Nenhuma cotação encontrada")
-            return
+        if not columns:
+            print("⚠️ Nenhuma cotação encontrada para exportar")
+            return None
         
-        rows = [format_quote_row(q) for q in quotes]
-        stocks = [r for r in rows if r["tipo"] in ("stock", "us_stock")]
-        
-        # Filter by signals
-        bullish = [r for r in stocks if r.get('signal_summary') == 'bullish']
-        bearish = [r for r in stocks if r.get('signal_summary') == 'bearish']
-        oversold = [r for r in stocks if r.get('signal_rsi_oversold') == 1]
-        overbought = [r for r in stocks if r.get('signal_rsi_overbought') == 1]
-        at_52w_low = [r for r in stocks if r.get('signal_52w_low') == 1]
-        at_52w_high = [r for r in stocks if r.get('signal_52w_high') == 1]
-        volume_spike = [r for r in stocks if r.get('signal_volume_spike') == 1]
-        golden_cross = [r for r in stocks if r.get('signal_golden_cross') == 1]
-        
-        print(f"\n{'='*80}")
-        print("  🚦 TRADING SIGNALS DETECTED")
-        print(f"{'='*80}")
-        
-        if bullish:
-            print(f"\n📈 BULLISH SIGNALS ({len(bullish)} stocks):")
-            for r in bullish[:10]:
-                print(f"   {r['ticker']:<8} {r['nome'][:20]:<20} RSI: {r.get('rsi_14', 'N/A'):>5} | YTD: {r.get('var_ytd', 0):>+6.1f}%")
-        
-        if bearish:
-            print(f"\n📉 BEARISH SIGNALS ({len(bearish)} stocks):")
-            for r in bearish[:10]:
-                print(f"   {r['ticker']:<8} {r['nome'][:20]:<20} RSI: {r.get('rsi_14', 'N/A'):>5} | YTD: {r.get('var_ytd', 0):>+6.1f}%")
-        
-        if oversold:
-            print(f"\n🟢 RSI OVERSOLD (<30) - Potential buy ({len(oversold)} stocks):")
-            for r in oversold:
-                print(f"   {r['ticker']:<8} RSI: {r.get('rsi_14', 0):>5.0f}")
-        
-        if overbought:
-            print(f"\n🔴 RSI OVERBOUGHT (>70) - Potential sell ({len(overbought)} stocks):")
-            for r in overbought:
-                print(f"   {r['ticker']:<8} RSI: {r.get('rsi_14', 0):>5.0f}")
-        
-        if at_52w_low:
-            print(f"\n⬇️ NEAR 52-WEEK LOW (within 5%) ({len(at_52w_low)} stocks):")
-            for r in at_52w_low:
-                print(f"   {r['ticker']:<8} {r['nome'][:20]:<20}")
-        
-        if at_52w_high:
-            print(f"\n⬆️ NEAR 52-WEEK HIGH (within 5%) ({len(at_52w_high)} stocks):")
-            for r in at_52w_high:
-                print(f"   {r['ticker']:<8} {r['nome'][:20]:<20}")
-        
-        if volume_spike:
-            print(f"\n📊 VOLUME SPIKE (>2x average) ({len(volume_spike)} stocks):")
-            for r in volume_spike:
-                ratio = r.get('volume_ratio', 0)
-                print(f"   {r['ticker']:<8} Volume: {ratio:>4.1f}x average")
-        
-        if golden_cross:
-            print(f"\n✨ GOLDEN CROSS (MA50 > MA200) ({len(golden_cross)} stocks):")
-            for r in golden_cross[:10]:
-                print(f"   {r['ticker']:<8} {r['nome'][:20]:<20}")
-        
-        print(f"\n{'='*80}\n")
+        # Gerar nome do arquivo
+        if not filename:
+            filename = f"cotacoes_colunas_{export_date(quote_date)}.json"
         
-    finally:
-        db.close()
-
-
-def print_news_sentiment():
-    """Imprime análise de sentimento de notícias"""
-    db = SessionLocal()
-    
-    try:
-        quotes = get_latest_quotes(db)
+        filepath = export_filepath(filename)
         
-        if not quotes:
-            print("⚠️ Nenhuma cotação encontrada")
-            return
+        # Criar diretório se não existir
+        os.makedirs(EXPORTS_PATH, exist_ok=True)
         
-        rows = [format_quote_row(q) for q in quotes]
-        stocks = [r for r in rows if r["tipo"] in ("stock", "us_stock")]
-        
-        # Filter by sentiment
-        positive = [r for r in stocks if r.get('news_sentiment_label') == 'positive']
-        negative = [r for r in stocks if r.get('news_sentiment_label') == 'negative']
-        neutral = [r for r in stocks if r.get('news_sentiment_label') == 'neutral']
-        
-        # Sort by combined sentiment score
-        positive.sort(key=lambda x: x.get('news_sentiment_combined', 0) or 0, reverse=True)
-        negative.sort(key=lambda x: x.get('news_sentiment_combined', 0) or 0)
-        
-        # Separate Brazilian and US stocks
-        br_positive = [r for r in positive if r["tipo"] == "stock"]
-        us_positive = [r for r in positive if r["tipo"] == "us_stock"]
-        br_negative = [r for r in negative if r["tipo"] == "stock"]
-        us_negative = [r for r in negative if r["tipo"] == "us_stock"]
-        
-        def format_score(score):
-            if score is None:
-                return "  N/A"
-            color = "\033[92m" if score >= 0.2 else ("\033[91m" if score <= -0.2 else "\033[93m")
-            return f"{color}{score:>+.2f}\033[0m"
-        
-        def truncate(text, max_len=50):
-            if not text:
-                return ""
-            return text[:max_len] + "..." if len(text) > max_len else text
-        
-        print(f"\n{'='*120}")
-        print("  📰 NEWS SENTIMENT ANALYSIS")
-        print(f"{'='*120}")
-        
-        # Brazilian stocks with positive sentiment
-        if br_positive:
-            print(f"\n🇧🇷 BRAZIL - 🟢 POSITIVE SENTIMENT ({len(br_positive)} stocks):")
-            for r in br_positive[:8]:
-                pt_score = format_score(r.get('news_sentiment_pt'))
-                en_score = format_score(r.get('news_sentiment_en'))
-                combined = format_score(r.get('news_sentiment_combined'))
-                pt_count = r.get('news_count_pt', 0) or 0
-                en_count = r.get('news_count_en', 0) or 0
-                headline = truncate(r.get('news_headline_pt') or r.get('news_headline_en', ''))
-                print(f"   {r['ticker']:<8} {r['nome'][:16]:<16} PT: {pt_score} ({pt_count}) | EN: {en_score} ({en_count}) | Combined: {combined}")
-                if headline:
-                    print(f"            \033[90m\"{headline}\"\033[0m")
-        
-        # Brazilian stocks with negative sentiment
-        if br_negative:
-            print(f"\n🇧🇷 BRAZIL - 🔴 NEGATIVE SENTIMENT ({len(br_negative)} stocks):")
-            for r in br_negative[:8]:
-                pt_score = format_score(r.get('news_sentiment_pt'))
-                en_score = format_score(r.get('news_sentiment_en'))
-                combined = format_score(r.get('news_sentiment_combined'))
-                pt_count = r.get('news_count_pt', 0) or 0
-                en_count = r.get('news_count_en', 0) or 0
-                headline = truncate(r.get('news_headline_pt') or r.get('news_headline_en', ''))
-                print(f"   {r['ticker']:<8} {r['nome'][:16]:<16} PT: {pt_score} ({pt_count}) | EN: {en_score} ({en_count}) | Combined: {combined}")
-                if headline:
-                    print(f"            \033[90m\"{headline}\"\033[0m")
-        
-        # US stocks with positive sentiment
-        if us_positive:
-            print(f"\n🇺🇸 USA - 🟢 POSITIVE SENTIMENT ({len(us_positive)} stocks):")
-            for r in us_positive[:8]:
-                en_score = format_score(r.get('news_sentiment_en'))
-                en_count = r.get('news_count_en', 0) or 0
-                headline = truncate(r.get('news_headline_en', ''))
-                print(f"   {r['ticker']:<8} {r['nome'][:16]:<16} EN: {en_score} ({en_count} articles)")
-                if headline:
-                    print(f"            \033[90m\"{headline}\"\033[0m")
-        
-        # US stocks with negative sentiment
-        if us_negative:
-            print(f"\n🇺🇸 USA - 🔴 NEGATIVE SENTIMENT ({len(us_negative)} stocks):")
-            for r in us_negative[:8]:
-                en_score = format_score(r.get('news_sentiment_en'))
-                en_count = r.get('news_count_en', 0) or 0
-                headline = truncate(r.get('news_headline_en', ''))
-                print(f"   {r['ticker']:<8} {r['nome'][:16]:<16} EN: {en_score} ({en_count} articles)")
-                if headline:
-                    print(f"            \033[90m\"{headline}\"\033[0m")
+        total = len(columns["ticker"])
+        data = {
+            "data_exportacao": datetime.now().strftime(TIMESTAMP_FORMAT),
+            "total_ativos": total,
+            "colunas": columns
+        }
         
-        # Summary
-        total_with_news = len([r for r in stocks if r.get('news_count_pt', 0) or r.get('news_count_en', 0)])
-        print(f"\n{'='*120}")
-        print(f"Summary: {len(positive)} positive | {len(negative)} negative | {len(neutral)} neutral | {total_with_news} stocks with news")
-        print("Score range: -1.0 (very negative) to +1.0 (very positive) | Threshold: ±0.2 for classification")
-        print("Brazilian stocks: 60% PT weight + 40% EN weight for combined score")
-        print(f"{'='*120}\n")
+        write_json(filepath, data)
         
-    finally:
-        db.close()
+        print(f"✅ JSON colunar exportado: {filepath} ({total} registros)")
+        return filepath
 
 
-def export_ai_json(filename: Optional[str] = None) -> str:
+def export_to_parquet(quote_date: Optional[date] = None, filename: Optional[str] = None,
+                      rows: Optional[List[dict]] = None) -> str:
     """
-    Exporta dados em formato otimizado para análise de AI
+    Exporta cotações para Parquet (zstd), para consumo analítico
+    
+    Args:
+        quote_date: Data específica para exportar (None = mais recentes)
+        filename: Nome do arquivo (None = gera automaticamente)
+        rows: Linhas já formatadas (None = consulta o banco)
+    
+    Returns:
+        Caminho do arquivo gerado
     """
-    db = SessionLocal()
+    if pa is None:
+        print("⚠️ pyarrow não instalado, exportação Parquet ignorada")
+        return None
     
-    try:
-        quotes = get_latest_quotes(db)
+    with report_session() as db:
+        if rows is None:
+            columns = format_quote_columns(query_latest_quotes(db, quote_date).all())
+        else:
+            columns = rows_to_columns(rows)
         
-        if not quotes:
+        if not columns:
             print("⚠️ Nenhuma cotação encontrada para exportar")
             return None
         
+        # Gerar nome do arquivo
         if not filename:
-            filename = f"ai_analysis_{datetime.now().strftime('%Y-%m-%d')}.json"
+            filename = f"cotacoes_{export_date(quote_date)}.parquet"
         
         filepath = os.path.join(EXPORTS_PATH, filename)
-        os.makedirs(EXPORTS_PATH, exist_ok=True)
-        
-        rows = [format_quote_row(q) for q in quotes]
         
-        # Structure for AI consumption
-        data = {
-            "metadata": {
-                "generated_at": datetime.now().isoformat(),
-                "total_assets": len(rows),
-                "data_version": "2.0",
-                "description": "B3 and US stock data with fundamentals for AI analysis"
-            },
-            "market_summary": {
-                "brazil_stocks": len([r for r in rows if r["tipo"] == "stock"]),
-                "us_stocks": len([r for r in rows if r["tipo"] == "us_stock"]),
-                "commodities": len([r for r in rows if r["tipo"] == "commodity"]),
-                "crypto": len([r for r in rows if r["tipo"] == "crypto"]),
-            },
-            "assets": rows
-        }
+        # Criar diretório se não existir
+        os.makedirs(EXPORTS_PATH, exist_ok=True)
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        table = pa.table(columns)
+        with atomic_write(filepath) as tmp_path:
+            pq.write_table(table, tmp_path, compression='zstd')
         
-        print(f"✅ AI JSON exportado: {filepath}")
+        print(f"✅ Parquet exportado: {filepath} ({table.num_rows} registros)")
         return filepath
-        
-    finally:
-        db.close()
 
 
-def generate_report_data() -> dict:
+# Formatos opcionais de export_all, ativados por EXPORT_FORMATS
+OPTIONAL_EXPORTS = {
+    "columns": export_to_json_columns,
+    "ndjson": export_to_ndjson,
+}
+
+
+def export_all(rows: Optional[List[dict]] = None) -> List[str]:
     """
-    Gera dados consolidados para relatórios (human e AI).
-    Retorna um dicionário com todos os dados processados.
+    Exporta as cotações em CSV, JSON e Parquet, mais os formatos opcionais de EXPORT_FORMATS
+    Retorna os caminhos dos arquivos gerados
     """
-    db = SessionLocal()
+    if rows is None:
+        rows = get_quote_rows()
     
-    try:
-        quotes = get_latest_quotes(db)
-        
-        if not quotes:
-            return None
+    paths = [export_to_csv(rows=rows), export_to_json(rows=rows), export_to_parquet(rows=rows)]
+    for name in EXPORT_FORMATS:
+        export = OPTIONAL_EXPORTS.get(name)
+        if export is None:
+            print(f"⚠️ Formato de exportação desconhecido: {name} (use: {', '.join(OPTIONAL_EXPORTS)})")
+            continue
+        paths.append(export(rows=rows))
+    return [path for path in paths if path]
+
+
+def partition_signals(stocks: List[dict]) -> dict:
+    """Separa as ações por sinal de trading numa única passada (mantém a ordem de stocks)"""
+    bullish, bearish, oversold, overbought = [], [], [], []
+    near_52w_high, near_52w_low, volume_spike, golden_cross = [], [], [], []
+    
+    for r in stocks:
+        summary = r["signal_summary"]
+        if summary == "bullish":
+            bullish.append(r)
+        elif summary == "bearish":
+            bearish.append(r)
+        if r["signal_rsi_oversold"] == 1:
+            oversold.append(r)
+        if r["signal_rsi_overbought"] == 1:
+            overbought.append(r)
+        if r["signal_52w_high"] == 1:
+            near_52w_high.append(r)
+        if r["signal_52w_low"] == 1:
+            near_52w_low.append(r)
+        if r["signal_volume_spike"] == 1:
+            volume_spike.append(r)
+        if r["signal_golden_cross"] == 1:
+            golden_cross.append(r)
+    
+    return {
+        "bullish": bullish,
+        "bearish": bearish,
+        "oversold": oversold,
+        "overbought": overbought,
+        "near_52w_high": near_52w_high,
+        "near_52w_low": near_52w_low,
+        "volume_spike": volume_spike,
+        "golden_cross": golden_cross,
+    }
+
+
+def partition_sentiment(stocks: List[dict]) -> dict:
+    """Separa as ações por news_sentiment_label numa única passada (mantém a ordem de stocks)"""
+    by_label = {"positive": [], "negative": [], "neutral": []}
+    for r in stocks:
+        bucket = by_label.get(r["news_sentiment_label"])
+        if bucket is not None:
+            bucket.append(r)
+    return by_label
+
+
+def print_summary(rows: Optional[List[dict]] = None):
+    """Imprime um resumo das cotações mais recentes com variações"""
+    if rows is None:
+        rows = get_quote_rows()
+    
+    if not rows:
+        print("⚠️ Nenhuma cotação encontrada")
+        return
+    
+    def print_section(title, section_rows):
+        """Imprime uma seção de ativos (uma única escrita no stdout)"""
+        if not section_rows:
+            return
         
-        rows = [format_quote_row(q) for q in quotes]
-        
-        # Separate by type
-        br_stocks = [r for r in rows if r["tipo"] == "stock"]
-        us_stocks = [r for r in rows if r["tipo"] == "us_stock"]
-        commodities = [r for r in rows if r["tipo"] == "commodity"]
-        crypto = [r for r in rows if r["tipo"] == "crypto"]
-        all_stocks = br_stocks + us_stocks
-        
-        # Top movers (1D)
-        stocks_with_1d = [r for r in all_stocks if r.get("var_1d") is not None]
-        top_gainers = sorted(stocks_with_1d, key=lambda x: x.get("var_1d", 0), reverse=True)[:10]
-        top_losers = sorted(stocks_with_1d, key=lambda x: x.get("var_1d", 0))[:10]
-        
-        # Signals
-        bullish = [r for r in all_stocks if r.get('signal_summary') == 'bullish']
-        bearish = [r for r in all_stocks if r.get('signal_summary') == 'bearish']
-        oversold = [r for r in all_stocks if r.get('signal_rsi_oversold') == 1]
-        overbought = [r for r in all_stocks if r.get('signal_rsi_overbought') == 1]
-        near_52w_high = [r for r in all_stocks if r.get('signal_52w_high') == 1]
-        near_52w_low = [r for r in all_stocks if r.get('signal_52w_low') == 1]
-        volume_spike = [r for r in all_stocks if r.get('signal_volume_spike') == 1]
-        golden_cross = [r for r in all_stocks if r.get('signal_golden_cross') == 1]
-        
-        # News sentiment
-        positive_news = sorted(
-            [r for r in all_stocks if r.get('news_sentiment_label') == 'positive'],
-            key=lambda x: x.get('news_sentiment_combined', 0) or 0,
-            reverse=True
-        )
-        negative_news = sorted(
-            [r for r in all_stocks if r.get('news_sentiment_label') == 'negative'],
-            key=lambda x: x.get('news_sentiment_combined', 0) or 0
-        )
-        
-        # Benchmark data (from first stock that has it)
-        ibov_ytd = None
-        sp500_ytd = None
-        for r in rows:
-            if r.get("ibov_change_ytd") and ibov_ytd is None:
-                ibov_ytd = r["ibov_change_ytd"]
-            if r.get("sp500_change_ytd") and sp500_ytd is None:
-                sp500_ytd = r["sp500_change_ytd"]
-            if ibov_ytd and sp500_ytd:
-                break
-        
-        # USD/BRL (from currency or calculate from stocks)
-        usd_brl = None
-        for r in rows:
-            if r["tipo"] == "currency":
-                usd_brl = r["preco_brl"]
-                break
-        
-        return {
-            "generated_at": datetime.now(),
-            "total_assets": len(rows),
-            "counts": {
-                "brazil_stocks": len(br_stocks),
-                "us_stocks": len(us_stocks),
-                "commodities": len(commodities),
-                "crypto": len(crypto),
-            },
-            "market_context": {
-                "ibov_ytd": ibov_ytd,
-                "sp500_ytd": sp500_ytd,
-                "usd_brl": usd_brl,
-            },
-            "top_movers": {
-                "gainers": top_gainers,
-                "losers": top_losers,
-            },
-            "signals": {
-                "bullish": bullish,
-                "bearish": bearish,
-                "oversold": oversold,
-                "overbought": overbought,
-                "near_52w_high": near_52w_high,
-                "near_52w_low": near_52w_low,
-                "volume_spike": volume_spike,
-                "golden_cross": golden_cross,
-            },
-            "news_sentiment": {
-                "positive": positive_news,
-                "negative": negative_news,
-            },
-            "all_data": rows,
-        }
+        lines = [
+            f"\n{'='*140}",
+            f"  {title}",
+            f"{'='*140}",
+            f"{'TICKER':<10} {'NOME':<20} {'BRL':>12} {'USD':>10} {'1D':>8} {'1W':>8} {'1M':>8} {'YTD':>8} {'5Y':>8} {'ALL':>8}",
+            "-"*140,
+        ]
+        
+        # Linhas já vêm ordenadas por setor: cada grupo consecutivo é um setor
+        for sector, sector_rows in groupby(section_rows, key=get_sector):
+            lines.append(f"\n--- {sector.upper()} ---")
+            
+            for row in sector_rows:
+                usd_str = f"{row['preco_usd']:>10.2f}" if row['preco_usd'] else "       N/A"
+                
+                lines.append(format_summary_row(
+                    row['ticker'], row['nome'][:19], row['preco_brl'], usd_str,
+                    *map(color_change, get_summary_changes(row))
+                ))
         
-    finally:
-        db.close()
+        lines.append("")
+        sys.stdout.write("\n".join(lines))
+    
+    # Separar por tipo de ativo numa única passada (cada seção herda a ordem setor/ticker do SQL)
+    by_type = defaultdict(list)
+    for r in rows:
+        by_type[r["tipo"]].append(r)
+    br_stocks = by_type["stock"]
+    us_stocks = by_type["us_stock"]
+    commodities = by_type["commodity"]
+    crypto = by_type["crypto"]
+    currency = by_type["currency"]
+    
+    # Imprimir cada seção
+    print_section("🇧🇷 AÇÕES BRASILEIRAS (B3)", br_stocks)
+    print_section("🇺🇸 AÇÕES AMERICANAS (NYSE/NASDAQ)", us_stocks)
+    print_section("🥇 COMMODITIES", commodities)
+    print_section("₿ CRIPTOMOEDAS", crypto)
+    print_section("💱 CÂMBIO", currency)
+    
+    sys.stdout.write(
+        f"\n{'='*140}\n"
+        f"Total de ativos: {len(rows)} | 🇧🇷 Brasil: {len(br_stocks)} | 🇺🇸 EUA: {len(us_stocks)} | "
+        f"Commodities: {len(commodities)} | Crypto: {len(crypto)}\n"
+        "Legenda: 1D = Dia anterior | 1W = 1 semana | 1M = 1 mês | YTD = Ano até a data | 5Y = 5 anos | ALL = Desde o início\n"
+        + "="*140 + "\n\n"
+    )
+
+
+def print_ai_analysis(rows: Optional[List[dict]] = None):
+    """Imprime análise detalhada com dados fundamentais para AI"""
+    if rows is None:
+        rows = get_quote_rows()
+    
+    if not rows:
+        print("⚠️ Nenhuma cotação encontrada")
+        return
+    
+    
+    lines = []
+    lines.append(f"\n{'='*180}")
+    lines.append("  🤖 AI INVESTMENT ANALYSIS - FUNDAMENTAL & TECHNICAL DATA")
+    lines.append(f"{'='*180}")
+    lines.append(f"{'TICKER':<8} {'NOME':<16} {'P/E':>7} {'BETA':>5} {'RSI':>5} {'vs52H':>8} {'vsIBOV':>8} {'vsSP500':>8} {'SIGNAL':>8} {'MA50':>5} {'MA200':>5} {'RATING':>8} {'VOL30D':>7}")
+    lines.append("-"*180)
+    
+    # Only show stocks (not commodities/crypto)
+    stocks = [r for r in rows if r["tipo"] in ("stock", "us_stock")]
+    # sort estável: dentro de cada tipo mantém a ordem setor/ticker do SQL
+    stocks.sort(key=lambda x: x["tipo"])
+    
+    current_type = None
+    for row in stocks:
+        if row["tipo"] != current_type:
+            current_type = row["tipo"]
+            label = "🇧🇷 BRAZIL" if current_type == "stock" else "🇺🇸 USA"
+            lines.append(f"\n{'='*40} {label} {'='*40}")
+        
+        pe = f"{row['pe_ratio']:>7.1f}" if row['pe_ratio'] else "    N/A"
+        beta = f"{row['beta']:>5.2f}" if row['beta'] else "  N/A"
+        ma50 = "  ✓" if row['above_ma_50'] == 1 else ("  ✗" if row['above_ma_50'] == 0 else " N/A")
+        ma200 = "  ✓" if row['above_ma_200'] == 1 else ("  ✗" if row['above_ma_200'] == 0 else " N/A")
+        vol30d = f"{row['volatility_30d']:>6.2f}%" if row['volatility_30d'] else "    N/A"
+        
+        # Use vs_ibov_ytd for Brazil, vs_sp500_ytd for US
+        if row["tipo"] == "stock":
+            vs_bench = format_pct(row['vs_ibov_ytd'])
+        else:
+            vs_bench = format_pct(row['vs_sp500_ytd'])
+        
+        lines.append(f"{row['ticker']:<8} {row['nome'][:15]:<16} {pe} {beta} "
+              f"{format_rsi(row['rsi_14'])} {format_pct(row['pct_from_52w_high'], invert=True)} "
+              f"{format_pct(row['vs_ibov_ytd'])} {format_pct(row['vs_sp500_ytd'])} "
+              f"{format_signal(row['signal_summary'])} {ma50} {ma200} {format_rating(row['analyst_rating'])} {vol30d}")
+    
+    lines.append(f"\n{'='*180}")
+    lines.append("Legend: vsIBOV/vsSP500 = YTD outperformance vs benchmark | SIGNAL = AI-detected signal (bullish/bearish/neutral)")
+    lines.append("        VOL30D = 30-day volatility | RSI = 14-day RSI (>70 overbought, <30 oversold) | vs52H = % from 52-week high")
+    lines.append("="*180 + "\n")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
-def export_human_report(filename: Optional[str] = None) -> str:
+def print_signals(rows: Optional[List[dict]] = None):
+    """Imprime sinais de trading detectados"""
+    if rows is None:
+        rows = get_quote_rows()
+    
+    if not rows:
+        print("⚠️ Nenhuma cotação encontrada")
+        return
+    
+    stocks = [r for r in rows if r["tipo"] in ("stock", "us_stock")]
+    
+    # Filter by signals (single pass)
+    signals = partition_signals(stocks)
+    bullish = signals["bullish"]
+    bearish = signals["bearish"]
+    oversold = signals["oversold"]
+    overbought = signals["overbought"]
+    at_52w_low = signals["near_52w_low"]
+    at_52w_high = signals["near_52w_high"]
+    volume_spike = signals["volume_spike"]
+    golden_cross = signals["golden_cross"]
+    
+    lines = []
+    lines.append(f"\n{'='*80}")
+    lines.append("  🚦 TRADING SIGNALS DETECTED")
+    lines.append(f"{'='*80}")
+    
+    if bullish:
+        lines.append(f"\n📈 BULLISH SIGNALS ({len(bullish)} stocks):")
+        for r in bullish[:10]:
+            lines.append(f"   {r['ticker']:<8} {r['nome'][:20]:<20} RSI: {r.get('rsi_14', 'N/A'):>5} | YTD: {r.get('var_ytd', 0):>+6.1f}%")
+    
+    if bearish:
+        lines.append(f"\n📉 BEARISH SIGNALS ({len(bearish)} stocks):")
+        for r in bearish[:10]:
+            lines.append(f"   {r['ticker']:<8} {r['nome'][:20]:<20} RSI: {r.get('rsi_14', 'N/A'):>5} | YTD: {r.get('var_ytd', 0):>+6.1f}%")
+    
+    if oversold:
+        lines.append(f"\n🟢 RSI OVERSOLD (<30) - Potential buy ({len(oversold)} stocks):")
+        for r in oversold:
+            lines.append(f"   {r['ticker']:<8} RSI: {r.get('rsi_14', 0):>5.0f}")
+    
+    if overbought:
+        lines.append(f"\n🔴 RSI OVERBOUGHT (>70) - Potential sell ({len(overbought)} stocks):")
+        for r in overbought:
+            lines.append(f"   {r['ticker']:<8} RSI: {r.get('rsi_14', 0):>5.0f}")
+    
+    if at_52w_low:
+        lines.append(f"\n⬇️ NEAR 52-WEEK LOW (within 5%) ({len(at_52w_low)} stocks):")
+        for r in at_52w_low:
+            lines.append(f"   {r['ticker']:<8} {r['nome'][:20]:<20}")
+    
+    if at_52w_high:
+        lines.append(f"\n⬆️ NEAR 52-WEEK HIGH (within 5%) ({len(at_52w_high)} stocks):")
+        for r in at_52w_high:
+            lines.append(f"   {r['ticker']:<8} {r['nome'][:20]:<20}")
+    
+    if volume_spike:
+        lines.append(f"\n📊 VOLUME SPIKE (>2x average) ({len(volume_spike)} stocks):")
+        for r in volume_spike:
+            ratio = r.get('volume_ratio', 0)
+            lines.append(f"   {r['ticker']:<8} Volume: {ratio:>4.1f}x average")
+    
+    if golden_cross:
+        lines.append(f"\n✨ GOLDEN CROSS (MA50 > MA200) ({len(golden_cross)} stocks):")
+        for r in golden_cross[:10]:
+            lines.append(f"   {r['ticker']:<8} {r['nome'][:20]:<20}")
+    
+    lines.append(f"\n{'='*80}\n")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def print_news_sentiment(rows: Optional[List[dict]] = None):
+    """Imprime análise de sentimento de notícias"""
+    if rows is None:
+        rows = get_quote_rows()
+    
+    if not rows:
+        print("⚠️ Nenhuma cotação encontrada")
+        return
+    
+    stocks = [r for r in rows if r["tipo"] in ("stock", "us_stock")]
+    
+    # Filter by sentiment (single pass)
+    sentiment = partition_sentiment(stocks)
+    positive = sentiment["positive"]
+    negative = sentiment["negative"]
+    neutral = sentiment["neutral"]
+    
+    # Sort by combined sentiment score
+    positive.sort(key=lambda x: x.get('news_sentiment_combined', 0) or 0, reverse=True)
+    negative.sort(key=lambda x: x.get('news_sentiment_combined', 0) or 0)
+    
+    # Separate Brazilian and US stocks
+    br_positive = [r for r in positive if r["tipo"] == "stock"]
+    us_positive = [r for r in positive if r["tipo"] == "us_stock"]
+    br_negative = [r for r in negative if r["tipo"] == "stock"]
+    us_negative = [r for r in negative if r["tipo"] == "us_stock"]
+    
+    lines = []
+    lines.append(f"\n{'='*120}")
+    lines.append("  📰 NEWS SENTIMENT ANALYSIS")
+    lines.append(f"{'='*120}")
+    
+    # Brazilian stocks with positive sentiment
+    if br_positive:
+        lines.append(f"\n🇧🇷 BRAZIL - 🟢 POSITIVE SENTIMENT ({len(br_positive)} stocks):")
+        for r in br_positive[:8]:
+            pt_score = format_score(r.get('news_sentiment_pt'))
+            en_score = format_score(r.get('news_sentiment_en'))
+            combined = format_score(r.get('news_sentiment_combined'))
+            pt_count = r.get('news_count_pt', 0) or 0
+            en_count = r.get('news_count_en', 0) or 0
+            headline = truncate(pick_headline(r))
+            lines.append(f"   {r['ticker']:<8} {r['nome'][:16]:<16} PT: {pt_score} ({pt_count}) | EN: {en_score} ({en_count}) | Combined: {combined}")
+            if headline:
+                lines.append(f"            \033[90m\"{headline}\"\033[0m")
+    
+    # Brazilian stocks with negative sentiment
+    if br_negative:
+        lines.append(f"\n🇧🇷 BRAZIL - 🔴 NEGATIVE SENTIMENT ({len(br_negative)} stocks):")
+        for r in br_negative[:8]:
+            pt_score = format_score(r.get('news_sentiment_pt'))
+            en_score = format_score(r.get('news_sentiment_en'))
+            combined = format_score(r.get('news_sentiment_combined'))
+            pt_count = r.get('news_count_pt', 0) or 0
+            en_count = r.get('news_count_en', 0) or 0
+            headline = truncate(pick_headline(r))
+            lines.append(f"   {r['ticker']:<8} {r['nome'][:16]:<16} PT: {pt_score} ({pt_count}) | EN: {en_score} ({en_count}) | Combined: {combined}")
+            if headline:
+                lines.append(f"            \033[90m\"{headline}\"\033[0m")
+    
+    # US stocks with positive sentiment
+    if us_positive:
+        lines.append(f"\n🇺🇸 USA - 🟢 POSITIVE SENTIMENT ({len(us_positive)} stocks):")
+        for r in us_positive[:8]:
+            en_score = format_score(r.get('news_sentiment_en'))
+            en_count = r.get('news_count_en', 0) or 0
+            headline = truncate(r.get('news_headline_en', ''))
+            lines.append(f"   {r['ticker']:<8} {r['nome'][:16]:<16} EN: {en_score} ({en_count} articles)")
+            if headline:
+                lines.append(f"            \033[90m\"{headline}\"\033[0m")
+    
+    # US stocks with negative sentiment
+    if us_negative:
+        lines.append(f"\n🇺🇸 USA - 🔴 NEGATIVE SENTIMENT ({len(us_negative)} stocks):")
+        for r in us_negative[:8]:
+            en_score = format_score(r.get('news_sentiment_en'))
+            en_count = r.get('news_count_en', 0) or 0
+            headline = truncate(r.get('news_headline_en', ''))
+            lines.append(f"   {r['ticker']:<8} {r['nome'][:16]:<16} EN: {en_score} ({en_count} articles)")
+            if headline:
+                lines.append(f"            \033[90m\"{headline}\"\033[0m")
+    
+    # Summary
+    total_with_news = len([r for r in stocks if r.get('news_count_pt', 0) or r.get('news_count_en', 0)])
+    lines.append(f"\n{'='*120}")
+    lines.append(f"Summary: {len(positive)} positive | {len(negative)} negative | {len(neutral)} neutral | {total_with_news} stocks with news")
+    lines.append("Score range: -1.0 (very negative) to +1.0 (very positive) | Threshold: ±0.2 for classification")
+    lines.append("Brazilian stocks: 60% PT weight + 40% EN weight for combined score")
+    lines.append(f"{'='*120}\n")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def export_ai_json(filename: Optional[str] = None, rows: Optional[List[dict]] = None) -> str:
     """
-    Exporta relatório em Markdown para leitura humana.
+    Exporta dados em formato otimizado para análise de AI
     """
-    data = generate_report_data()
+    if rows is None:
+        rows = get_quote_rows()
     
-    if not data:
-        print("⚠️ Nenhum dado para gerar relatório")
+    if not rows:
+        print("⚠️ Nenhuma cotação encontrada para exportar")
         return None
     
     if not filename:
-        filename = f"report_{datetime.now().strftime('%Y-%m-%d')}.md"
+        filename = f"ai_analysis_{export_date()}.json"
     
-    filepath = os.path.join(EXPORTS_PATH, filename)
+    filepath = export_filepath(filename)
     os.makedirs(EXPORTS_PATH, exist_ok=True)
     
-    lines = []
+    # Structure for AI consumption (assets streamed one by one)
+    envelope = {
+        "metadata": {
+            "generated_at": datetime.now().isoformat(),
+            "total_assets": len(rows),
+            "data_version": "2.0",
+            "description": "B3 and US stock data with fundamentals for AI analysis"
+        },
+        "market_summary": {
+            "brazil_stocks": len([r for r in rows if r["tipo"] == "stock"]),
+            "us_stocks": len([r for r in rows if r["tipo"] == "us_stock"]),
+            "commodities": len([r for r in rows if r["tipo"] == "commodity"]),
+            "crypto": len([r for r in rows if r["tipo"] == "crypto"]),
+        },
+    }
     
-    # Header
-    lines.append(f"# 📈 B3 Tracker Report - {data['generated_at'].strftime('%Y-%m-%d %H:%M')}")
-    lines.append("")
-    
-    # Market Summary
-    lines.append("## 📊 Market Summary")
-    lines.append("")
-    lines.append(f"- **Total de ativos**: {data['total_assets']}")
-    lines.append(f"  - 🇧🇷 Brasil: {data['counts']['brazil_stocks']}")
-    lines.append(f"  - 🇺🇸 EUA: {data['counts']['us_stocks']}")
-    lines.append(f"  - 🥇 Commodities: {data['counts']['commodities']}")
-    lines.append(f"  - ₿ Crypto: {data['counts']['crypto']}")
-    lines.append("")
-    
-    ctx = data['market_context']
-    if ctx['ibov_ytd'] or ctx['sp500_ytd']:
-        lines.append("### Benchmarks YTD")
-        if ctx['ibov_ytd']:
-            lines.append(f"- **IBOV**: {ctx['ibov_ytd']:+.1f}%")
-        if ctx['sp500_ytd']:
-            lines.append(f"- **S&P 500**: {ctx['sp500_ytd']:+.1f}%")
-        if ctx['usd_brl']:
-            lines.append(f"- **USD/BRL**: R$ {ctx['usd_brl']:.2f}")
-        lines.append("")
+    write_json_array(filepath, envelope, "assets", rows)
     
-    # Top Movers
-    lines.append("## 🔥 Top Movers (1D)")
-    lines.append("")
-    
-    lines.append("### 📈 Maiores Altas")
-    lines.append("| Ticker | Nome | Variação 1D |")
-    lines.append("|--------|------|-------------|")
-    for r in data['top_movers']['gainers'][:5]:
-        lines.append(f"| {r['ticker']} | {r['nome'][:20]} | {r['var_1d']:+.2f}% |")
-    lines.append("")
-    
-    lines.append("### 📉 Maiores Quedas")
-    lines.append("| Ticker | Nome | Variação 1D |")
-    lines.append("|--------|------|-------------|")
-    for r in data['top_movers']['losers'][:5]:
-        lines.append(f"| {r['ticker']} | {r['nome'][:20]} | {r['var_1d']:+.2f}% |")
-    lines.append("")
-    
-    # Trading Signals
-    lines.append("## 🚦 Trading Signals")
-    lines.append("")
-    
-    signals = data['signals']
-    
-    if signals['bullish']:
-        lines.append(f"### 📈 Bullish ({len(signals['bullish'])} stocks)")
-        tickers = ", ".join([r['ticker'] for r in signals['bullish'][:15]])
-        lines.append(f"{tickers}")
-        lines.append("")
+    print(f"✅ AI JSON exportado: {filepath}")
+    return filepath
+
+
+def generate_report_data(rows: Optional[List[dict]] = None) -> dict:
+    """
+    Gera dados consolidados para relatórios (human e AI).
+    Retorna um dicionário com todos os dados processados.
+    """
+    if rows is None:
+        rows = get_quote_rows()
     
-    if signals['bearish']:
-        lines.append(f"### 📉 Bearish ({len(signals['bearish'])} stocks)")
-        tickers = ", ".join([r['ticker'] for r in signals['bearish'][:15]])
-        lines.append(f"{tickers}")
-        lines.append("")
+    if not rows:
+        return None
     
-    if signals['oversold']:
-        lines.append(f"### 🟢 RSI Oversold (<30) - Potencial compra")
-        for r in signals['oversold'][:5]:
-            lines.append(f"- **{r['ticker']}** ({r['nome'][:20]}) - RSI: {r['rsi_14']:.0f}")
-        lines.append("")
+    # Separate by type (single pass)
+    by_type = defaultdict(list)
+    for r in rows:
+        by_type[r["tipo"]].append(r)
+    br_stocks = by_type["stock"]
+    us_stocks = by_type["us_stock"]
+    commodities = by_type["commodity"]
+    crypto = by_type["crypto"]
+    all_stocks = br_stocks + us_stocks
     
-    if signals['overbought']:
-        lines.append(f"### 🔴 RSI Overbought (>70) - Potencial venda")
-        for r in signals['overbought'][:5]:
-            lines.append(f"- **{r['ticker']}** ({r['nome'][:20]}) - RSI: {r['rsi_14']:.0f}")
-        lines.append("")
+    # Top movers (1D)
+    stocks_with_1d = [r for r in all_stocks if r.get("var_1d") is not None]
+    # heapq: O(n log k) em vez de ordenar tudo; mesma ordem (estável) que sorted(...)[:10]
+    get_var_1d = itemgetter("var_1d")
+    top_gainers = heapq.nlargest(10, stocks_with_1d, key=get_var_1d)
+    top_losers = heapq.nsmallest(10, stocks_with_1d, key=get_var_1d)
     
-    if signals['near_52w_high']:
-        lines.append(f"### ⬆️ Próximo da Máxima 52 semanas ({len(signals['near_52w_high'])} stocks)")
-        tickers = ", ".join([r['ticker'] for r in signals['near_52w_high'][:10]])
-        lines.append(f"{tickers}")
-        lines.append("")
+    # Signals (single pass)
+    signals = partition_signals(all_stocks)
     
-    if signals['near_52w_low']:
-        lines.append(f"### ⬇️ Próximo da Mínima 52 semanas ({len(signals['near_52w_low'])} stocks)")
-        tickers = ", ".join([r['ticker'] for r in signals['near_52w_low'][:10]])
-        lines.append(f"{tickers}")
-        lines.append("")
+    # News sentiment
+    sentiment = partition_sentiment(all_stocks)
+    positive_news = sorted(
+        sentiment["positive"],
+        key=lambda x: x.get('news_sentiment_combined', 0) or 0,
+        reverse=True
+    )
+    negative_news = sorted(
+        sentiment["negative"],
+        key=lambda x: x.get('news_sentiment_combined', 0) or 0
+    )
     
-    # News Sentiment
-    lines.append("## 📰 News Sentiment")
-    lines.append("")
+    # Benchmark data (from first stock that has it)
+    ibov_ytd = None
+    sp500_ytd = None
+    for r in rows:
+        if r.get("ibov_change_ytd") and ibov_ytd is None:
+            ibov_ytd = r["ibov_change_ytd"]
+        if r.get("sp500_change_ytd") and sp500_ytd is None:
+            sp500_ytd = r["sp500_change_ytd"]
+        if ibov_ytd and sp500_ytd:
+            break
     
-    news = data['news_sentiment']
+    # Manchetes das ações listadas nos relatórios (top 10 de cada lado), escolhidas uma vez
+    headlines = {r["ticker"]: pick_headline(r) for r in positive_news[:10] + negative_news[:10]}
     
-    if news['positive']:
-        lines.append(f"### 🟢 Sentimento Positivo ({len(news['positive'])} stocks)")
-        for r in news['positive'][:5]:
-            score = r.get('news_sentiment_combined', 0) or 0
-            headline = r.get('news_headline_pt') or r.get('news_headline_en', '')
-            headline = headline[:60] + "..." if len(headline) > 60 else headline
-            lines.append(f"- **{r['ticker']}** (score: {score:+.2f})")
-            if headline:
-                lines.append(f"  - *\"{headline}\"*")
-        lines.append("")
+    # USD/BRL (from currency or calculate from stocks)
+    usd_brl = None
+    for r in rows:
+        if r["tipo"] == "currency":
+            usd_brl = r["preco_brl"]
+            break
     
-    if news['negative']:
-        lines.append(f"### 🔴 Sentimento Negativo ({len(news['negative'])} stocks)")
-        for r in news['negative'][:5]:
-            score = r.get('news_sentiment_combined', 0) or 0
-            headline = r.get('news_headline_pt') or r.get('news_headline_en', '')
-            headline = headline[:60] + "..." if len(headline) > 60 else headline
-            lines.append(f"- **{r['ticker']}** (score: {score:+.2f})")
-            if headline:
-                lines.append(f"  - *\"{headline}\"*")
-        lines.append("")
+    return {
+        "generated_at": datetime.now(),
+        "total_assets": len(rows),
+        "counts": {
+            "brazil_stocks": len(br_stocks),
+            "us_stocks": len(us_stocks),
+            "commodities": len(commodities),
+            "crypto": len(crypto),
+        },
+        "market_context": {
+            "ibov_ytd": ibov_ytd,
+            "sp500_ytd": sp500_ytd,
+            "usd_brl": usd_brl,
+        },
+        "top_movers": {
+            "gainers": top_gainers,
+            "losers": top_losers,
+        },
+        "signals": signals,
+        "news_sentiment": {
+            "positive": positive_news,
+            "negative": negative_news,
+        },
+        "headlines": headlines,
+        "all_data": rows,
+    }
+
+
+def export_human_report(filename: Optional[str] = None, data: Optional[dict] = None) -> str:
+    """
+    Exporta relatório em Markdown para leitura humana.
+    data: resultado de generate_report_data (None = calcula aqui)
+    """
+    if data is None:
+        data = generate_report_data()
     
-    # Footer
-    lines.append("---")
-    lines.append(f"*Gerado em {data['generated_at'].strftime('%Y-%m-%d %H:%M:%S')} por B3 Tracker*")
+    if not data:
+        print("⚠️ Nenhum dado para gerar relatório")
+        return None
+    
+    if not filename:
+        filename = f"report_{export_date()}.md"
     
-    # Write file
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write("\n".join(lines))
+    filepath = os.path.join(EXPORTS_PATH, filename)
+    os.makedirs(EXPORTS_PATH, exist_ok=True)
+    
+    # Escrita direta no arquivo bufferizado, sem lista de linhas nem string intermediária
+    with atomic_write(filepath) as tmp_path, open(tmp_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+        w = f.write
+        
+        def line(text: str = ""):
+            w(text)
+            w("\n")
+        
+        # Header
+        line(f"# 📈 B3 Tracker Report - {data['generated_at'].strftime('%Y-%m-%d %H:%M')}")
+        line()
+        
+        # Market Summary
+        line("## 📊 Market Summary")
+        line()
+        line(f"- **Total de ativos**: {data['total_assets']}")
+        line(f"  - 🇧🇷 Brasil: {data['counts']['brazil_stocks']}")
+        line(f"  - 🇺🇸 EUA: {data['counts']['us_stocks']}")
+        line(f"  - 🥇 Commodities: {data['counts']['commodities']}")
+        line(f"  - ₿ Crypto: {data['counts']['crypto']}")
+        line()
+        
+        ctx = data['market_context']
+        if ctx['ibov_ytd'] or ctx['sp500_ytd']:
+            line("### Benchmarks YTD")
+            if ctx['ibov_ytd']:
+                line(f"- **IBOV**: {ctx['ibov_ytd']:+.1f}%")
+            if ctx['sp500_ytd']:
+                line(f"- **S&P 500**: {ctx['sp500_ytd']:+.1f}%")
+            if ctx['usd_brl']:
+                line(f"- **USD/BRL**: R$ {ctx['usd_brl']:.2f}")
+            line()
+        
+        # Top Movers
+        line("## 🔥 Top Movers (1D)")
+        line()
+        
+        line("### 📈 Maiores Altas")
+        line("| Ticker | Nome | Variação 1D |")
+        line("|--------|------|-------------|")
+        w("".join(
+            f"| {r['ticker']} | {r['nome'][:20]} | {r['var_1d']:+.2f}% |\n"
+            for r in data['top_movers']['gainers'][:5]
+        ))
+        line()
+        
+        line("### 📉 Maiores Quedas")
+        line("| Ticker | Nome | Variação 1D |")
+        line("|--------|------|-------------|")
+        w("".join(
+            f"| {r['ticker']} | {r['nome'][:20]} | {r['var_1d']:+.2f}% |\n"
+            for r in data['top_movers']['losers'][:5]
+        ))
+        line()
+        
+        # Trading Signals
+        line("## 🚦 Trading Signals")
+        line()
+        
+        signals = data['signals']
+        
+        if signals['bullish']:
+            line(f"### 📈 Bullish ({len(signals['bullish'])} stocks)")
+            tickers = ", ".join([r['ticker'] for r in signals['bullish'][:15]])
+            line(f"{tickers}")
+            line()
+        
+        if signals['bearish']:
+            line(f"### 📉 Bearish ({len(signals['bearish'])} stocks)")
+            tickers = ", ".join([r['ticker'] for r in signals['bearish'][:15]])
+            line(f"{tickers}")
+            line()
+        
+        if signals['oversold']:
+            line(f"### 🟢 RSI Oversold (<30) - Potencial compra")
+            for r in signals['oversold'][:5]:
+                line(f"- **{r['ticker']}** ({r['nome'][:20]}) - RSI: {r['rsi_14']:.0f}")
+            line()
+        
+        if signals['overbought']:
+            line(f"### 🔴 RSI Overbought (>70) - Potencial venda")
+            for r in signals['overbought'][:5]:
+                line(f"- **{r['ticker']}** ({r['nome'][:20]}) - RSI: {r['rsi_14']:.0f}")
+            line()
+        
+        if signals['near_52w_high']:
+            line(f"### ⬆️ Próximo da Máxima 52 semanas ({len(signals['near_52w_high'])} stocks)")
+            tickers = ", ".join([r['ticker'] for r in signals['near_52w_high'][:10]])
+            line(f"{tickers}")
+            line()
+        
+        if signals['near_52w_low']:
+            line(f"### ⬇️ Próximo da Mínima 52 semanas ({len(signals['near_52w_low'])} stocks)")
+            tickers = ", ".join([r['ticker'] for r in signals['near_52w_low'][:10]])
+            line(f"{tickers}")
+            line()
+        
+        # News Sentiment
+        line("## 📰 News Sentiment")
+        line()
+        
+        news = data['news_sentiment']
+        
+        if news['positive']:
+            line(f"### 🟢 Sentimento Positivo ({len(news['positive'])} stocks)")
+            for r in news['positive'][:5]:
+                score = r.get('news_sentiment_combined', 0) or 0
+                headline = truncate(data['headlines'][r['ticker']], 60)
+                line(f"- **{r['ticker']}** (score: {score:+.2f})")
+                if headline:
+                    line(f"  - *\"{headline}\"*")
+            line()
+        
+        if news['negative']:
+            line(f"### 🔴 Sentimento Negativo ({len(news['negative'])} stocks)")
+            for r in news['negative'][:5]:
+                score = r.get('news_sentiment_combined', 0) or 0
+                headline = truncate(data['headlines'][r['ticker']], 60)
+                line(f"- **{r['ticker']}** (score: {score:+.2f})")
+                if headline:
+                    line(f"  - *\"{headline}\"*")
+            line()
+        
+        # Footer
+        line("---")
+        w(f"*Gerado em {data['generated_at'].strftime(TIMESTAMP_FORMAT)} por B3 Tracker*")
     
     print(f"✅ Relatório Human exportado: {filepath}")
     return filepath
 
 
-def export_ai_report(filename: Optional[str] = None) -> str:
+def export_ai_report(filename: Optional[str] = None, data: Optional[dict] = None) -> str:
     """
     Exporta relatório JSON estruturado para consumo por AI/LLM.
+    data: resultado de generate_report_data (None = calcula aqui)
     """
-    data = generate_report_data()
+    if data is None:
+        data = generate_report_data()
     
     if not data:
         print("⚠️ Nenhum dado para gerar relatório")
         return None
     
     if not filename:
-        filename = f"ai_report_{datetime.now().strftime('%Y-%m-%d')}.json"
+        filename = f"ai_report_{export_date()}.json"
     
-    filepath = os.path.join(EXPORTS_PATH, filename)
+    filepath = export_filepath(filename)
     os.makedirs(EXPORTS_PATH, exist_ok=True)
     
     # Build AI-optimized structure
@@ -943,7 +1422,7 @@ def export_ai_report(filename: Optional[str] = None) -> str:
                 {
                     "ticker": r['ticker'],
                     "score": r.get('news_sentiment_combined'),
-                    "headline": (r.get('news_headline_pt') or r.get('news_headline_en', ''))[:100]
+                    "headline": data['headlines'][r['ticker']][:100]
                 }
                 for r in data['news_sentiment']['positive'][:10]
             ],
@@ -951,7 +1430,7 @@ def export_ai_report(filename: Optional[str] = None) -> str:
                 {
                     "ticker": r['ticker'],
                     "score": r.get('news_sentiment_combined'),
-                    "headline": (r.get('news_headline_pt') or r.get('news_headline_en', ''))[:100]
+                    "headline": data['headlines'][r['ticker']][:100]
                 }
                 for r in data['news_sentiment']['negative'][:10]
             ],
@@ -970,23 +1449,25 @@ def export_ai_report(filename: Optional[str] = None) -> str:
                 if r.get('var_ytd', 0) and r['var_ytd'] > 20
             ][:10],
         },
-        "full_data": data['all_data'],
     }
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    # orjson (C) quando disponível; full_data serializado linha a linha.
+    # default=str mantém o formato anterior para valores fora do JSON (ex.: datetime)
+    write_json_array(filepath, report, "full_data", data['all_data'], default=str)
     
     print(f"✅ Relatório AI exportado: {filepath}")
     return filepath
 
 
-def generate_reports() -> tuple:
+def generate_reports(rows: Optional[List[dict]] = None) -> tuple:
     """
     Gera ambos os relatórios (Human e AI).
     Retorna tupla com os caminhos dos arquivos.
     """
-    human_path = export_human_report()
-    ai_path = export_ai_report()
+    # Dados consolidados calculados uma vez e compartilhados pelos dois relatórios
+    data = generate_report_data(rows)
+    human_path = export_human_report(data=data)
+    ai_path = export_ai_report(data=data)
     return human_path, ai_path
 
 
@@ -995,10 +1476,11 @@ if __name__ == "__main__":
     init_db()
     
     print("\n📊 Exportando cotações...\n")
-    export_to_csv()
-    export_to_json()
-    export_ai_json()
-    print_summary()
-    print_ai_analysis()
-    print_signals()
-    print_news_sentiment()
+    rows = get_quote_rows()
+    export_to_csv(rows=rows)
+    export_to_json(rows=rows)
+    export_ai_json(rows=rows)
+    print_summary(rows=rows)
+    print_ai_analysis(rows=rows)
+    print_signals(rows=rows)
+    print_news_sentiment(rows=rows)
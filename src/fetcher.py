@@ -4,14 +4,17 @@ Módulo para buscar cotações usando yfinance
 import yfinance as yf
 from datetime import datetime, date, timedelta
 from typing import Optional
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 import urllib.parse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 
+import cache
 from assets import get_all_assets, IBOVESPA_STOCKS, COMMODITIES, CRYPTO, CURRENCY, US_STOCKS
 from models import Asset, Quote
 from database import SessionLocal
+from signals import detect, to_mask
 
 # Initialize NLTK VADER for sentiment analysis
 try:
@@ -59,14 +62,25 @@ except Exception as e:
     _feedparser_available = False
 
 
+# Dados de referência (câmbio e benchmarks) reaproveitados entre execuções do scheduler
+REFERENCE_DATA_TTL = 60 * 60
+
+
+@cache.memoize(ttl=REFERENCE_DATA_TTL)
+def fetch_usd_brl_rate() -> float:
+    """Cotação atual do dólar em reais (memoizada; falhas levantam exceção e não entram no cache)"""
+    ticker = yf.Ticker("USDBRL=X")
+    # Usar período maior para garantir dados
+    data = ticker.history(period="5d")
+    if data.empty:
+        raise ValueError("sem dados para USDBRL=X")
+    return float(data['Close'].iloc[-1])
+
+
 def get_usd_brl_rate() -> float:
     """Obtém a cotação atual do dólar em reais"""
     try:
-        ticker = yf.Ticker("USDBRL=X")
-        # Usar período maior para garantir dados
-        data = ticker.history(period="5d")
-        if not data.empty:
-            return float(data['Close'].iloc[-1])
+        return fetch_usd_brl_rate()
     except Exception as e:
         print(f"⚠️ Erro ao buscar cotação USD/BRL: {e}")
     
@@ -86,12 +100,14 @@ def calculate_rsi(prices, period: int = 14) -> Optional[float]:
     if len(prices) < period + 1:
         return None
     
-    deltas = prices.diff()
+    # Só a última janela entra no resultado: period variações = period + 1 preços
+    # (evita diff/rolling sobre todo o histórico "max")
+    deltas = prices.iloc[-(period + 1):].diff().iloc[1:]
     gains = deltas.where(deltas > 0, 0)
     losses = (-deltas).where(deltas < 0, 0)
     
-    avg_gain = gains.rolling(window=period).mean().iloc[-1]
-    avg_loss = losses.rolling(window=period).mean().iloc[-1]
+    avg_gain = gains.mean()
+    avg_loss = losses.mean()
     
     if avg_loss == 0:
         return 100.0
@@ -166,7 +182,7 @@ def calculate_technical_indicators(hist, current_price: float) -> dict:
     
     # Volatility (30-day standard deviation of daily returns)
     if len(hist) >= 30:
-        returns = hist['Close'].pct_change().tail(30)
+        returns = hist['Close'].tail(31).pct_change().tail(30)
         result["volatility_30d"] = float(returns.std() * 100)  # As percentage
     
     # Volume analysis
@@ -275,7 +291,7 @@ def fetch_news_portuguese(company_name: str, ticker: str, max_news: int = 10) ->
     
     try:
         # Clean ticker for search (remove .SA)
-        clean_ticker = ticker.replace(".SA", "")
+        clean_ticker = ticker.removesuffix(".SA")
         
         # Search for company name and ticker
         search_query = f"{company_name} OR {clean_ticker} ações bolsa"
@@ -419,17 +435,17 @@ def fetch_news_sentiment(ticker_symbol: str, company_name: str, is_brazilian: bo
     return result
 
 
-# Global cache for benchmark data (fetched once per run)
-_benchmark_cache = {}
+@cache.memoize(ttl=REFERENCE_DATA_TTL)
+def fetch_benchmark_history(ticker_symbol: str):
+    """1-year history of a benchmark index (memoized; empty results raise and are not cached)"""
+    hist = yf.Ticker(ticker_symbol).history(period="1y")
+    if hist.empty:
+        raise ValueError(f"no data for {ticker_symbol}")
+    return hist
 
 
 def fetch_benchmark_data() -> dict:
-    """Fetch Ibovespa and S&P 500 historical changes (cached)"""
-    global _benchmark_cache
-    
-    if _benchmark_cache:
-        return _benchmark_cache
-    
+    """Fetch Ibovespa and S&P 500 historical changes (history cached for REFERENCE_DATA_TTL)"""
     print("📊 Buscando dados de benchmark (IBOV, S&P500)...")
     
     benchmarks = {
@@ -441,11 +457,7 @@ def fetch_benchmark_data() -> dict:
     
     for ticker_symbol, prefix in benchmarks.items():
         try:
-            ticker = yf.Ticker(ticker_symbol)
-            hist = ticker.history(period="1y")
-            
-            if hist.empty:
-                continue
+            hist = fetch_benchmark_history(ticker_symbol)
             
             today = hist.index[-1].date()
             current_price = float(hist['Close'].iloc[-1])
@@ -471,7 +483,6 @@ def fetch_benchmark_data() -> dict:
         except Exception as e:
             print(f"  ⚠️ Error fetching {ticker_symbol}: {e}")
     
-    _benchmark_cache = result
     return result
 
 
@@ -518,10 +529,41 @@ def get_historical_price(hist_data, target_date: date) -> Optional[float]:
     return None
 
 
-def fetch_quote_with_history(ticker_symbol: str) -> Optional[dict]:
+def download_histories(tickers: list) -> dict:
+    """
+    Baixa o histórico completo (period="max") de vários tickers numa única chamada yf.download
+    
+    Returns:
+        dict {ticker: DataFrame}; tickers sem dados ficam de fora (buscados depois com ticker.history)
+    """
+    try:
+        # auto_adjust=True: mesmos preços (ajustados) de Ticker.history
+        data = yf.download(tickers, period="max", group_by="ticker", auto_adjust=True,
+                           threads=True, progress=False)
+    except Exception as e:
+        print(f"⚠️ Batch download failed: {e}")
+        return {}
+    
+    histories = {}
+    for ticker_symbol in tickers:
+        try:
+            # O índice é a união dos pregões de todos os tickers: descarta os dias sem negociação deste
+            hist = data[ticker_symbol].dropna(subset=["Close"])
+        except KeyError:
+            continue
+        if not hist.empty:
+            histories[ticker_symbol] = hist
+    
+    return histories
+
+
+def fetch_quote_with_history(ticker_symbol: str, hist=None) -> Optional[dict]:
     """
     Busca a cotação de um ativo com dados históricos, fundamentais e técnicos
     
+    Args:
+        hist: Histórico já baixado (download_histories); None = busca com ticker.history
+    
     Returns:
         dict com dados completos para análise de AI ou None se falhar
     """
@@ -529,7 +571,8 @@ def fetch_quote_with_history(ticker_symbol: str) -> Optional[dict]:
         ticker = yf.Ticker(ticker_symbol)
         
         # Buscar dados máximos para cobrir todas as comparações (5Y e ALL)
-        hist = ticker.history(period="max")
+        if hist is None:
+            hist = ticker.history(period="max")
         
         if hist.empty:
             print(f"⚠️ Sem dados para {ticker_symbol}")
@@ -650,6 +693,7 @@ def get_or_create_asset(db: Session, ticker: str, info: dict, asset_type: str) -
     if not asset:
         asset = Asset(
             ticker=ticker,
+            display_ticker=ticker.removesuffix(".SA"),
             name=info.get("name", "Desconhecido"),
             sector=info.get("sector", "Outro"),
             asset_type=asset_type,
@@ -663,209 +707,215 @@ def get_or_create_asset(db: Session, ticker: str, info: dict, asset_type: str) -
     return asset
 
 
+# Colunas de Quote preenchidas a partir do dict de fetch_quote_with_history: (coluna, chave)
+QUOTE_DATA_FIELDS = (
+    ("open_price", "open"),
+    ("high_price", "high"),
+    ("low_price", "low"),
+    ("volume", "volume"),
+    # Campos históricos
+    ("change_1d", "change_1d"),
+    ("change_1w", "change_1w"),
+    ("change_1m", "change_1m"),
+    ("change_ytd", "change_ytd"),
+    ("price_1d_ago", "price_1d"),
+    ("price_1w_ago", "price_1w"),
+    ("price_1m_ago", "price_1m"),
+    ("price_ytd", "price_ytd"),
+    ("price_5y_ago", "price_5y"),
+    ("price_all_time", "price_all"),
+    ("change_5y", "change_5y"),
+    ("change_all", "change_all"),
+    # Fundamental data
+    ("market_cap", "market_cap"),
+    ("pe_ratio", "pe_ratio"),
+    ("forward_pe", "forward_pe"),
+    ("pb_ratio", "pb_ratio"),
+    ("dividend_yield", "dividend_yield"),
+    ("eps", "eps"),
+    # Risk metrics
+    ("beta", "beta"),
+    ("week_52_high", "week_52_high"),
+    ("week_52_low", "week_52_low"),
+    ("pct_from_52w_high", "pct_from_52w_high"),
+    # Technical indicators
+    ("ma_50", "ma_50"),
+    ("ma_200", "ma_200"),
+    ("rsi_14", "rsi_14"),
+    ("above_ma_50", "above_ma_50"),
+    ("above_ma_200", "above_ma_200"),
+    ("ma_50_above_200", "ma_50_above_200"),
+    # Financial health
+    ("profit_margin", "profit_margin"),
+    ("roe", "roe"),
+    ("debt_to_equity", "debt_to_equity"),
+    # Analyst data
+    ("analyst_rating", "analyst_rating"),
+    ("target_price", "target_price"),
+    ("num_analysts", "num_analysts"),
+    # Benchmark data
+    ("ibov_change_1d", "ibov_change_1d"),
+    ("ibov_change_1w", "ibov_change_1w"),
+    ("ibov_change_1m", "ibov_change_1m"),
+    ("ibov_change_ytd", "ibov_change_ytd"),
+    ("sp500_change_1d", "sp500_change_1d"),
+    ("sp500_change_1w", "sp500_change_1w"),
+    ("sp500_change_1m", "sp500_change_1m"),
+    ("sp500_change_ytd", "sp500_change_ytd"),
+    ("vs_ibov_1d", "vs_ibov_1d"),
+    ("vs_ibov_1m", "vs_ibov_1m"),
+    ("vs_ibov_ytd", "vs_ibov_ytd"),
+    ("vs_sp500_1d", "vs_sp500_1d"),
+    ("vs_sp500_1m", "vs_sp500_1m"),
+    ("vs_sp500_ytd", "vs_sp500_ytd"),
+    # Signals
+    ("signal_golden_cross", "signal_golden_cross"),
+    ("signal_death_cross", "signal_death_cross"),
+    ("signal_rsi_oversold", "signal_rsi_oversold"),
+    ("signal_rsi_overbought", "signal_rsi_overbought"),
+    ("signal_52w_high", "signal_52w_high"),
+    ("signal_52w_low", "signal_52w_low"),
+    ("signal_volume_spike", "signal_volume_spike"),
+    ("signal_summary", "signal_summary"),
+    # Volatility
+    ("volatility_30d", "volatility_30d"),
+    ("avg_volume_20d", "avg_volume_20d"),
+    ("volume_ratio", "volume_ratio"),
+    # News sentiment
+    ("news_sentiment_pt", "news_sentiment_pt"),
+    ("news_sentiment_en", "news_sentiment_en"),
+    ("news_sentiment_combined", "news_sentiment_combined"),
+    ("news_count_pt", "news_count_pt"),
+    ("news_count_en", "news_count_en"),
+    ("news_headline_pt", "news_headline_pt"),
+    ("news_headline_en", "news_headline_en"),
+    ("news_sentiment_label", "news_sentiment_label"),
+)
+
+
+def quote_day(quote_data: dict) -> datetime:
+    """Data da cotação (meia-noite), como gravada em Quote.quote_date"""
+    quote_date = quote_data["date"].date() if isinstance(quote_data["date"], datetime) else quote_data["date"]
+    return datetime.combine(quote_date, datetime.min.time())
+
+
+def quote_values(quote_data: dict, price_brl: float, price_usd: float = None) -> dict:
+    """Valores das colunas de Quote (exceto asset_id/quote_date/fetched_at) para uma cotação buscada"""
+    values = {"price_brl": price_brl, "price_usd": price_usd}
+    values.update((column, quote_data.get(key)) for column, key in QUOTE_DATA_FIELDS)
+    
+    # Sinais da API, calculados uma vez aqui em vez de a cada requisição
+    values["signals_mask"] = to_mask(detect(
+        quote_data.get("rsi_14"),
+        quote_data.get("ma_50_above_200"),
+        quote_data.get("above_ma_50"),
+        quote_data.get("above_ma_200"),
+        quote_data.get("pct_from_52w_high"),
+        quote_data.get("week_52_low"),
+        price_brl,
+        quote_data.get("volume_ratio"),
+        quote_data.get("news_sentiment_combined"),
+    ))
+    return values
+
+
 def save_quote(db: Session, asset: Asset, quote_data: dict, price_brl: float, price_usd: float = None):
     """Salva uma cotação no banco de dados com dados históricos"""
-    quote_date = quote_data["date"].date() if isinstance(quote_data["date"], datetime) else quote_data["date"]
+    quote_date = quote_day(quote_data)
+    values = quote_values(quote_data, price_brl, price_usd)
     
     # Verificar se já existe cotação para este ativo nesta data
     existing = db.query(Quote).filter(
         Quote.asset_id == asset.id,
-        Quote.quote_date == datetime.combine(quote_date, datetime.min.time())
+        Quote.quote_date == quote_date
     ).first()
     
     if existing:
         # Atualizar cotação existente
-        existing.price_brl = price_brl
-        existing.price_usd = price_usd
-        existing.open_price = quote_data.get("open")
-        existing.high_price = quote_data.get("high")
-        existing.low_price = quote_data.get("low")
-        existing.volume = quote_data.get("volume")
-        # Atualizar campos históricos
-        existing.change_1d = quote_data.get("change_1d")
-        existing.change_1w = quote_data.get("change_1w")
-        existing.change_1m = quote_data.get("change_1m")
-        existing.change_ytd = quote_data.get("change_ytd")
-        existing.price_1d_ago = quote_data.get("price_1d")
-        existing.price_1w_ago = quote_data.get("price_1w")
-        existing.price_1m_ago = quote_data.get("price_1m")
-        existing.price_ytd = quote_data.get("price_ytd")
-        existing.price_5y_ago = quote_data.get("price_5y")
-        existing.price_all_time = quote_data.get("price_all")
-        existing.change_5y = quote_data.get("change_5y")
-        existing.change_all = quote_data.get("change_all")
-        # Fundamental data
-        existing.market_cap = quote_data.get("market_cap")
-        existing.pe_ratio = quote_data.get("pe_ratio")
-        existing.forward_pe = quote_data.get("forward_pe")
-        existing.pb_ratio = quote_data.get("pb_ratio")
-        existing.dividend_yield = quote_data.get("dividend_yield")
-        existing.eps = quote_data.get("eps")
-        # Risk metrics
-        existing.beta = quote_data.get("beta")
-        existing.week_52_high = quote_data.get("week_52_high")
-        existing.week_52_low = quote_data.get("week_52_low")
-        existing.pct_from_52w_high = quote_data.get("pct_from_52w_high")
-        # Technical indicators
-        existing.ma_50 = quote_data.get("ma_50")
-        existing.ma_200 = quote_data.get("ma_200")
-        existing.rsi_14 = quote_data.get("rsi_14")
-        existing.above_ma_50 = quote_data.get("above_ma_50")
-        existing.above_ma_200 = quote_data.get("above_ma_200")
-        existing.ma_50_above_200 = quote_data.get("ma_50_above_200")
-        # Financial health
-        existing.profit_margin = quote_data.get("profit_margin")
-        existing.roe = quote_data.get("roe")
-        existing.debt_to_equity = quote_data.get("debt_to_equity")
-        # Analyst data
-        existing.analyst_rating = quote_data.get("analyst_rating")
-        existing.target_price = quote_data.get("target_price")
-        existing.num_analysts = quote_data.get("num_analysts")
-        # Benchmark data
-        existing.ibov_change_1d = quote_data.get("ibov_change_1d")
-        existing.ibov_change_1w = quote_data.get("ibov_change_1w")
-        existing.ibov_change_1m = quote_data.get("ibov_change_1m")
-        existing.ibov_change_ytd = quote_data.get("ibov_change_ytd")
-        existing.sp500_change_1d = quote_data.get("sp500_change_1d")
-        existing.sp500_change_1w = quote_data.get("sp500_change_1w")
-        existing.sp500_change_1m = quote_data.get("sp500_change_1m")
-        existing.sp500_change_ytd = quote_data.get("sp500_change_ytd")
-        existing.vs_ibov_1d = quote_data.get("vs_ibov_1d")
-        existing.vs_ibov_1m = quote_data.get("vs_ibov_1m")
-        existing.vs_ibov_ytd = quote_data.get("vs_ibov_ytd")
-        existing.vs_sp500_1d = quote_data.get("vs_sp500_1d")
-        existing.vs_sp500_1m = quote_data.get("vs_sp500_1m")
-        existing.vs_sp500_ytd = quote_data.get("vs_sp500_ytd")
-        # Signals
-        existing.signal_golden_cross = quote_data.get("signal_golden_cross")
-        existing.signal_death_cross = quote_data.get("signal_death_cross")
-        existing.signal_rsi_oversold = quote_data.get("signal_rsi_oversold")
-        existing.signal_rsi_overbought = quote_data.get("signal_rsi_overbought")
-        existing.signal_52w_high = quote_data.get("signal_52w_high")
-        existing.signal_52w_low = quote_data.get("signal_52w_low")
-        existing.signal_volume_spike = quote_data.get("signal_volume_spike")
-        existing.signal_summary = quote_data.get("signal_summary")
-        # Volatility
-        existing.volatility_30d = quote_data.get("volatility_30d")
-        existing.avg_volume_20d = quote_data.get("avg_volume_20d")
-        existing.volume_ratio = quote_data.get("volume_ratio")
-        # News sentiment
-        existing.news_sentiment_pt = quote_data.get("news_sentiment_pt")
-        existing.news_sentiment_en = quote_data.get("news_sentiment_en")
-        existing.news_sentiment_combined = quote_data.get("news_sentiment_combined")
-        existing.news_count_pt = quote_data.get("news_count_pt")
-        existing.news_count_en = quote_data.get("news_count_en")
-        existing.news_headline_pt = quote_data.get("news_headline_pt")
-        existing.news_headline_en = quote_data.get("news_headline_en")
-        existing.news_sentiment_label = quote_data.get("news_sentiment_label")
+        for column, value in values.items():
+            setattr(existing, column, value)
         existing.fetched_at = datetime.utcnow()
         print(f"🔄 Atualizado: {asset.ticker} = R$ {price_brl:.2f}")
     else:
         # Criar nova cotação
-        quote = Quote(
-            asset_id=asset.id,
-            price_brl=price_brl,
-            price_usd=price_usd,
-            open_price=quote_data.get("open"),
-            high_price=quote_data.get("high"),
-            low_price=quote_data.get("low"),
-            volume=quote_data.get("volume"),
-            # Campos históricos
-            change_1d=quote_data.get("change_1d"),
-            change_1w=quote_data.get("change_1w"),
-            change_1m=quote_data.get("change_1m"),
-            change_ytd=quote_data.get("change_ytd"),
-            price_1d_ago=quote_data.get("price_1d"),
-            price_1w_ago=quote_data.get("price_1w"),
-            price_1m_ago=quote_data.get("price_1m"),
-            price_ytd=quote_data.get("price_ytd"),
-            price_5y_ago=quote_data.get("price_5y"),
-            price_all_time=quote_data.get("price_all"),
-            change_5y=quote_data.get("change_5y"),
-            change_all=quote_data.get("change_all"),
-            # Fundamental data
-            market_cap=quote_data.get("market_cap"),
-            pe_ratio=quote_data.get("pe_ratio"),
-            forward_pe=quote_data.get("forward_pe"),
-            pb_ratio=quote_data.get("pb_ratio"),
-            dividend_yield=quote_data.get("dividend_yield"),
-            eps=quote_data.get("eps"),
-            # Risk metrics
-            beta=quote_data.get("beta"),
-            week_52_high=quote_data.get("week_52_high"),
-            week_52_low=quote_data.get("week_52_low"),
-            pct_from_52w_high=quote_data.get("pct_from_52w_high"),
-            # Technical indicators
-            ma_50=quote_data.get("ma_50"),
-            ma_200=quote_data.get("ma_200"),
-            rsi_14=quote_data.get("rsi_14"),
-            above_ma_50=quote_data.get("above_ma_50"),
-            above_ma_200=quote_data.get("above_ma_200"),
-            ma_50_above_200=quote_data.get("ma_50_above_200"),
-            # Financial health
-            profit_margin=quote_data.get("profit_margin"),
-            roe=quote_data.get("roe"),
-            debt_to_equity=quote_data.get("debt_to_equity"),
-            # Analyst data
-            analyst_rating=quote_data.get("analyst_rating"),
-            target_price=quote_data.get("target_price"),
-            num_analysts=quote_data.get("num_analysts"),
-            # Benchmark data
-            ibov_change_1d=quote_data.get("ibov_change_1d"),
-            ibov_change_1w=quote_data.get("ibov_change_1w"),
-            ibov_change_1m=quote_data.get("ibov_change_1m"),
-            ibov_change_ytd=quote_data.get("ibov_change_ytd"),
-            sp500_change_1d=quote_data.get("sp500_change_1d"),
-            sp500_change_1w=quote_data.get("sp500_change_1w"),
-            sp500_change_1m=quote_data.get("sp500_change_1m"),
-            sp500_change_ytd=quote_data.get("sp500_change_ytd"),
-            vs_ibov_1d=quote_data.get("vs_ibov_1d"),
-            vs_ibov_1m=quote_data.get("vs_ibov_1m"),
-            vs_ibov_ytd=quote_data.get("vs_ibov_ytd"),
-            vs_sp500_1d=quote_data.get("vs_sp500_1d"),
-            vs_sp500_1m=quote_data.get("vs_sp500_1m"),
-            vs_sp500_ytd=quote_data.get("vs_sp500_ytd"),
-            # Signals
-            signal_golden_cross=quote_data.get("signal_golden_cross"),
-            signal_death_cross=quote_data.get("signal_death_cross"),
-            signal_rsi_oversold=quote_data.get("signal_rsi_oversold"),
-            signal_rsi_overbought=quote_data.get("signal_rsi_overbought"),
-            signal_52w_high=quote_data.get("signal_52w_high"),
-            signal_52w_low=quote_data.get("signal_52w_low"),
-            signal_volume_spike=quote_data.get("signal_volume_spike"),
-            signal_summary=quote_data.get("signal_summary"),
-            # Volatility
-            volatility_30d=quote_data.get("volatility_30d"),
-            avg_volume_20d=quote_data.get("avg_volume_20d"),
-            volume_ratio=quote_data.get("volume_ratio"),
-            # News sentiment
-            news_sentiment_pt=quote_data.get("news_sentiment_pt"),
-            news_sentiment_en=quote_data.get("news_sentiment_en"),
-            news_sentiment_combined=quote_data.get("news_sentiment_combined"),
-            news_count_pt=quote_data.get("news_count_pt"),
-            news_count_en=quote_data.get("news_count_en"),
-            news_headline_pt=quote_data.get("news_headline_pt"),
-            news_headline_en=quote_data.get("news_headline_en"),
-            news_sentiment_label=quote_data.get("news_sentiment_label"),
-            quote_date=datetime.combine(quote_date, datetime.min.time())
-        )
+        quote = Quote(asset_id=asset.id, quote_date=quote_date, **values)
         db.add(quote)
         print(f"💰 Salvo: {asset.ticker} = R$ {price_brl:.2f}")
     
     db.commit()
 
 
+def save_quotes(db: Session, results: list) -> int:
+    """
+    Salva as cotações de vários ativos numa única transação (upsert em lote)
+    
+    Ativos novos entram com INSERT ... ON CONFLICT(ticker) DO NOTHING e as cotações com
+    INSERT ... ON CONFLICT(asset_id, quote_date) DO UPDATE, sem SELECT + commit por ativo.
+    
+    Args:
+        results: dicts de fetch_single_asset
+    
+    Returns:
+        Número de cotações gravadas
+    """
+    if not results:
+        return 0
+    
+    assets = Asset.__table__
+    db.execute(
+        sqlite_insert(assets).on_conflict_do_nothing(index_elements=["ticker"]),
+        [
+            {
+                "ticker": r["ticker"],
+                "display_ticker": r["ticker"].removesuffix(".SA"),
+                "name": r["info"].get("name", "Desconhecido"),
+                "sector": r["info"].get("sector", "Outro"),
+                "asset_type": r["asset_type"],
+                "unit": r["info"].get("unit", ""),
+            }
+            for r in results
+        ],
+    )
+    
+    # ticker -> asset_id numa única consulta
+    asset_ids = dict(
+        db.query(Asset.ticker, Asset.id).filter(Asset.ticker.in_([r["ticker"] for r in results]))
+    )
+    
+    now = datetime.utcnow()
+    rows = [
+        {
+            "asset_id": asset_ids[r["ticker"]],
+            "quote_date": quote_day(r["quote_data"]),
+            "fetched_at": now,
+            **quote_values(r["quote_data"], r["price_brl"], r["price_usd"]),
+        }
+        for r in results
+    ]
+    
+    stmt = sqlite_insert(Quote.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["asset_id", "quote_date"],
+        set_={column: stmt.excluded[column] for column in rows[0] if column not in ("asset_id", "quote_date")},
+    )
+    db.execute(stmt, rows)
+    db.commit()
+    
+    return len(rows)
+
+
 def fetch_single_asset(ticker: str, info: dict, asset_type: str, is_brazilian: bool, 
-                       usd_brl: float, benchmarks: dict) -> Optional[dict]:
+                       usd_brl: float, benchmarks: dict, hist=None) -> Optional[dict]:
     """
     Fetch a single asset's quote, news, and prepare data for saving.
     This function is designed to be called in parallel.
+    hist is the pre-downloaded price history (None = fetch it with ticker.history).
     
     Returns:
         dict with all data needed for saving, or None if fetch failed
     """
     try:
-        quote_data = fetch_quote_with_history(ticker)
+        quote_data = fetch_quote_with_history(ticker, hist)
         if not quote_data:
             return None
         
@@ -982,13 +1032,21 @@ def fetch_all_quotes():
     phase2_start = time.time()
     print(f"\n📊 Fase 2: Buscando cotações (8 workers paralelos)...")
     
+    # Históricos de preço de todos os ativos numa única chamada em lote;
+    # os que faltarem são buscados individualmente por fetch_single_asset
+    histories = download_histories([ticker for ticker, _, _, _ in all_assets])
+    print(f"   📥 Históricos em lote: {len(histories)}/{total_assets}")
+    
     results = []
     success_count = 0
     error_count = 0
     
     with ThreadPoolExecutor(max_workers=8) as executor:
         futures = {
-            executor.submit(fetch_single_asset, ticker, info, asset_type, is_br, usd_brl, benchmarks): ticker
+            executor.submit(
+                fetch_single_asset, ticker, info, asset_type, is_br, usd_brl, benchmarks,
+                histories.get(ticker)
+            ): ticker
             for ticker, info, asset_type, is_br in all_assets
         }
         
@@ -1035,25 +1093,32 @@ def fetch_all_quotes():
     
     db = SessionLocal()
     try:
-        saved_count = 0
-        for result in results:
-            try:
-                asset = get_or_create_asset(
-                    db, 
-                    result["ticker"], 
-                    result["info"], 
-                    result["asset_type"]
-                )
-                save_quote(
-                    db, 
-                    asset, 
-                    result["quote_data"], 
-                    result["price_brl"], 
-                    result["price_usd"]
-                )
-                saved_count += 1
-            except Exception as e:
-                print(f"    ❌ Error saving {result['ticker']}: {e}")
+        try:
+            saved_count = save_quotes(db, results)
+        except Exception as e:
+            # Fallback: um ativo por vez, isolando o registro com problema
+            db.rollback()
+            print(f"    ⚠️ Bulk save failed ({e}), saving one by one...")
+            saved_count = 0
+            for result in results:
+                try:
+                    asset = get_or_create_asset(
+                        db, 
+                        result["ticker"], 
+                        result["info"], 
+                        result["asset_type"]
+                    )
+                    save_quote(
+                        db, 
+                        asset, 
+                        result["quote_data"], 
+                        result["price_brl"], 
+                        result["price_usd"]
+                    )
+                    saved_count += 1
+                except Exception as e:
+                    db.rollback()
+                    print(f"    ❌ Error saving {result['ticker']}: {e}")
         
         print(f"   ✅ Salvos: {saved_count} registros")
         print(f"   ⏱️  Fase 4 concluída em {time.time() - phase4_start:.1f}s\n")
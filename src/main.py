@@ -21,7 +21,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from database import init_db
 from fetcher import fetch_all_quotes
 from exporter import (
-    export_to_csv, export_to_json, print_summary, 
+    get_quote_rows, export_all, print_summary,
     print_ai_analysis, print_signals, print_news_sentiment,
     generate_reports
 )
@@ -56,18 +56,18 @@ def main():
         # Executar apenas uma vez
         print("🔄 Modo: Execução única\n")
         fetch_all_quotes()
-        export_to_csv()
-        export_to_json()
-        print_summary()
-        print_signals()
-        print_news_sentiment()
+        rows = get_quote_rows()
+        export_all(rows=rows)
+        print_summary(rows=rows)
+        print_signals(rows=rows)
+        print_news_sentiment(rows=rows)
         
     elif "--export" in args or "-e" in args:
         # Apenas exportar
         print("📤 Modo: Exportação\n")
-        export_to_csv()
-        export_to_json()
-        print_summary()
+        rows = get_quote_rows()
+        export_all(rows=rows)
+        print_summary(rows=rows)
         
     elif "--summary" in args or "-s" in args:
         # Apenas mostrar resumo
@@ -87,9 +87,10 @@ def main():
     elif "--ai" in args:
         # Análise detalhada para AI
         print("🤖 Modo: AI Analysis\n")
-        print_ai_analysis()
-        print_signals()
-        print_news_sentiment()
+        rows = get_quote_rows()
+        print_ai_analysis(rows=rows)
+        print_signals(rows=rows)
+        print_news_sentiment(rows=rows)
     
     elif "--report" in args or "-r" in args:
         # Gerar relatórios Human (Markdown) e AI (JSON)
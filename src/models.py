@@ -1,8 +1,9 @@
 """
 Modelos do banco de dados
 """
+from typing import Optional
 from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import aliased, relationship
 from datetime import datetime
 from database import Base
 
@@ -13,9 +14,10 @@ class Asset(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     ticker = Column(String(20), unique=True, nullable=False, index=True)
+    display_ticker = Column(String(20), nullable=True, index=True)  # ticker sem ".SA" (exibição/exportação)
     name = Column(String(100), nullable=False)
     sector = Column(String(50), nullable=False)
-    asset_type = Column(String(20), nullable=False)  # stock, commodity, crypto, currency
+    asset_type = Column(String(20), nullable=False, index=True)  # stock, commodity, crypto, currency
     unit = Column(String(20), default="")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -123,6 +125,7 @@ class Quote(Base):
     signal_52w_low = Column(Integer, nullable=True)       # 1 if at/near 52w low
     signal_volume_spike = Column(Integer, nullable=True)  # 1 if volume > 2x average
     signal_summary = Column(String(50), nullable=True)    # Overall signal: bullish/bearish/neutral
+    signals_mask = Column(Integer, nullable=True)         # Bitmask of signals.SIGNALS (API signals)
     
     # === VOLATILITY ===
     volatility_30d = Column(Float, nullable=True)       # 30-day volatility (std dev of returns)
@@ -139,16 +142,43 @@ class Quote(Base):
     news_headline_en = Column(String(500), nullable=True)  # Latest English headline
     news_sentiment_label = Column(String(20), nullable=True)  # positive/negative/neutral
     
-    quote_date = Column(DateTime, nullable=False)  # Data da cotação
-    fetched_at = Column(DateTime, default=datetime.utcnow)  # Quando foi buscado
+    quote_date = Column(DateTime, nullable=False, index=True)  # Data da cotação
+    fetched_at = Column(DateTime, default=datetime.utcnow, index=True)  # Quando foi buscado (MAX indexado: chave do /api/report)
     
     # Relacionamento com ativo
     asset = relationship("Asset", back_populates="quotes")
     
     # Índice único para evitar duplicatas no mesmo dia
+    # (também cobre as buscas da última cotação por ativo: asset_id, quote_date)
     __table_args__ = (
         UniqueConstraint('asset_id', 'quote_date', name='unique_asset_date'),
     )
     
     def __repr__(self):
         return f"<Quote(asset_id={self.asset_id}, price_brl={self.price_brl}, date={self.quote_date})>"
+
+
+class LatestQuote(Base):
+    """Cache da cotação mais recente de cada ativo (mantido por triggers em quotes, ver database.init_db)"""
+    __tablename__ = "latest_quotes"
+    
+    asset_id = Column(Integer, ForeignKey("assets.id"), primary_key=True)
+    quote_id = Column(Integer, ForeignKey("quotes.id"), nullable=False)
+    quote_date = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f"<LatestQuote(asset_id={self.asset_id}, quote_id={self.quote_id}, date={self.quote_date})>"
+
+
+def latest_quote_subquery(db, asset_type: Optional[str] = None):
+    """Alias de Quote sobre a cotação mais recente de cada ativo (uma linha por ativo, via latest_quotes)
+    
+    Mesma fonte das exportações: o cache latest_quotes mantido pelos triggers de quotes.
+    asset_type restringe os ativos dentro do subselect.
+    """
+    latest = db.query(Quote).join(LatestQuote, LatestQuote.quote_id == Quote.id)
+    if asset_type:
+        latest = latest.filter(Quote.asset_id.in_(
+            db.query(Asset.id).filter(Asset.asset_type == asset_type)
+        ))
+    return aliased(Quote, latest.subquery())
@@ -8,7 +8,7 @@ from datetime import datetime
 
 from database import init_db
 from fetcher import fetch_all_quotes
-from exporter import export_to_csv, export_to_json, print_summary
+from exporter import export_all, print_summary, get_quote_rows
 
 
 def job():
@@ -21,9 +21,9 @@ def job():
         
         # Exportar arquivos
         if success > 0:
-            export_to_csv()
-            export_to_json()
-            print_summary()
+            rows = get_quote_rows()
+            export_all(rows=rows)
+            print_summary(rows=rows)
         
         print(f"✅ Job concluído com sucesso!")
         
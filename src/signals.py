@@ -0,0 +1,107 @@
+"""
+Regras de sinais de trading (compartilhadas entre fetcher, banco e API)
+
+Cada sinal ocupa um bit de Quote.signals_mask, na ordem de SIGNALS.
+"""
+from functools import lru_cache
+from typing import List
+
+from sqlalchemy import and_, case, literal
+
+
+SIGNALS = (
+    "RSI_OVERSOLD",
+    "RSI_OVERBOUGHT",
+    "GOLDEN_CROSS",
+    "BULLISH_TREND",
+    "BEARISH_TREND",
+    "NEAR_52W_HIGH",
+    "NEAR_52W_LOW",
+    "VOLUME_SPIKE",
+    "POSITIVE_NEWS",
+    "NEGATIVE_NEWS",
+)
+SIGNAL_BITS = {name: 1 << i for i, name in enumerate(SIGNALS)}
+
+
+@lru_cache(maxsize=4096)
+def detect(rsi_14, ma_50_above_200, above_ma_50, above_ma_200, pct_from_52w_high,
+           week_52_low, price_brl, volume_ratio, news_sentiment_combined) -> tuple:
+    """Signal rules over the scalar fields they read (pure, so memoized by value)"""
+    signals = []
+    
+    # RSI signals
+    if rsi_14:
+        if rsi_14 < 30:
+            signals.append("RSI_OVERSOLD")
+        elif rsi_14 > 70:
+            signals.append("RSI_OVERBOUGHT")
+    
+    # Moving average signals
+    if ma_50_above_200:
+        signals.append("GOLDEN_CROSS")
+    if above_ma_50 and above_ma_200:
+        signals.append("BULLISH_TREND")
+    elif above_ma_50 == 0 and above_ma_200 == 0:
+        signals.append("BEARISH_TREND")
+    
+    # 52 week signals
+    if pct_from_52w_high is not None and pct_from_52w_high > -5:
+        signals.append("NEAR_52W_HIGH")
+    if week_52_low and price_brl:
+        pct_from_low = ((price_brl - week_52_low) / week_52_low) * 100
+        if pct_from_low < 5:
+            signals.append("NEAR_52W_LOW")
+    
+    # Volume spike
+    if volume_ratio and volume_ratio > 2.0:
+        signals.append("VOLUME_SPIKE")
+    
+    # News sentiment
+    if news_sentiment_combined:
+        if news_sentiment_combined > 0.3:
+            signals.append("POSITIVE_NEWS")
+        elif news_sentiment_combined < -0.3:
+            signals.append("NEGATIVE_NEWS")
+    
+    return tuple(signals)
+
+
+def to_mask(signals) -> int:
+    """Pack signal names into a signals_mask value"""
+    mask = 0
+    for name in signals:
+        mask |= SIGNAL_BITS[name]
+    return mask
+
+
+def from_mask(mask: int) -> List[str]:
+    """Unpack a signals_mask value into signal names, in SIGNALS order"""
+    if not mask:
+        return []
+    return [name for name in SIGNALS if mask & SIGNAL_BITS[name]]
+
+
+def signal_conditions(quote) -> List[tuple]:
+    """SQL version of detect for a Quote entity/alias, in SIGNALS order"""
+    pct_from_low = ((quote.price_brl - quote.week_52_low) / quote.week_52_low) * 100
+    return [
+        ("RSI_OVERSOLD", and_(quote.rsi_14 != 0, quote.rsi_14 < 30)),
+        ("RSI_OVERBOUGHT", quote.rsi_14 > 70),
+        ("GOLDEN_CROSS", quote.ma_50_above_200 != 0),
+        ("BULLISH_TREND", and_(quote.above_ma_50 != 0, quote.above_ma_200 != 0)),
+        ("BEARISH_TREND", and_(quote.above_ma_50 == 0, quote.above_ma_200 == 0)),
+        ("NEAR_52W_HIGH", quote.pct_from_52w_high > -5),
+        ("NEAR_52W_LOW", and_(quote.week_52_low != 0, quote.price_brl != 0, pct_from_low < 5)),
+        ("VOLUME_SPIKE", quote.volume_ratio > 2.0),
+        ("POSITIVE_NEWS", quote.news_sentiment_combined > 0.3),
+        ("NEGATIVE_NEWS", quote.news_sentiment_combined < -0.3),
+    ]
+
+
+def mask_expression(quote):
+    """SQL expression that computes signals_mask from a Quote's columns"""
+    expr = literal(0)
+    for name, condition in signal_conditions(quote):
+        expr = expr + case((condition, SIGNAL_BITS[name]), else_=0)
+    return expr
@@ -0,0 +1,13 @@
+"""
+Configuração dos testes: src no path e um banco SQLite temporário
+"""
+import os
+import sys
+import tempfile
+
+# Antes de importar database: o engine é criado a partir de DB_PATH
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="b3_tracker_tests_"), "cotacoes.db")
+# Cache sempre em memória nos testes
+os.environ.pop("REDIS_URL", None)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
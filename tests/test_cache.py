@@ -0,0 +1,151 @@
+"""
+Testes do cache em memória: memoize (TTL, chave, cache_clear) e try_lock
+"""
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio controlado pelo teste no lugar de time.monotonic"""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def local_cache(monkeypatch):
+    """Força o backend em memória, sem locks de outros testes"""
+    monkeypatch.setattr(cache, "_redis", None)
+    monkeypatch.setattr(cache, "_locks", {})
+    monkeypatch.setattr(cache, "_local", {})
+
+
+def test_memoize_until_ttl_expires(clock):
+    calls = []
+    
+    @cache.memoize(ttl=10)
+    def square(x):
+        calls.append(x)
+        return x * x
+    
+    assert square(3) == 9
+    clock.value += 9.9
+    assert square(3) == 9
+    assert calls == [3]
+    
+    # Expira exatamente em ttl segundos
+    clock.value += 0.1
+    assert square(3) == 9
+    assert calls == [3, 3]
+
+
+def test_memoize_caches_per_key(clock):
+    calls = []
+    
+    @cache.memoize(ttl=10, key=lambda db, asset_type=None: asset_type)
+    def load(db, asset_type=None):
+        calls.append(asset_type)
+        return [asset_type]
+    
+    # A sessão (db) não entra na chave
+    assert load(object(), "stock") == ["stock"]
+    assert load(object(), "stock") == ["stock"]
+    assert load(object(), asset_type="crypto") == ["crypto"]
+    assert calls == ["stock", "crypto"]
+
+
+def test_memoize_cache_clear(clock):
+    calls = []
+    
+    @cache.memoize(ttl=3600)
+    def rate():
+        calls.append(1)
+        return 5.0
+    
+    rate()
+    rate()
+    rate.cache_clear()
+    rate()
+    assert len(calls) == 2
+
+
+def test_cached_value_expires(clock, local_cache):
+    cache.set_cached("quotes", b"[]", ttl=5)
+    assert cache.get_cached("quotes") == b"[]"
+    clock.value += 5.1
+    assert cache.get_cached("quotes") is None
+
+
+def test_try_lock(clock, local_cache):
+    assert cache.try_lock("refresh", ttl=60)
+    assert not cache.try_lock("refresh", ttl=60)
+    
+    cache.release_lock("refresh")
+    assert cache.try_lock("refresh", ttl=60)
+    
+    # Um lock esquecido expira sozinho
+    clock.value += 61
+    assert cache.try_lock("refresh", ttl=60)
+
+
+def test_local_cache_drops_expired_and_oldest(clock, local_cache, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_MAX_ENTRIES", 3)
+    cache.set_cached("quotes:None:200", b"a", ttl=5)
+    cache.set_cached("quotes:stock:10", b"b", ttl=60)
+    cache.set_cached("quotes:stock:20", b"c", ttl=60)
+    
+    # Cheio: a chave expirada sai antes das válidas
+    clock.value += 10
+    cache.set_cached("quotes:crypto:5", b"d", ttl=60)
+    assert list(cache._local) == ["quotes:stock:10", "quotes:stock:20", "quotes:crypto:5"]
+    
+    # Sem expiradas: sai a gravada há mais tempo
+    cache.set_cached("quotes:commodity:5", b"e", ttl=60)
+    assert len(cache._local) == 3
+    assert cache.get_cached("quotes:stock:10") is None
+    assert cache.get_cached("quotes:commodity:5") == b"e"
+
+
+def test_expired_read_removes_entry(clock, local_cache):
+    cache.set_cached("report", b"{}", ttl=5)
+    clock.value += 6
+    assert cache.get_cached("report") is None
+    assert "report" not in cache._local
+
+
+def test_memoize_max_entries(clock):
+    calls = []
+    
+    @cache.memoize(ttl=60, max_entries=2)
+    def double(x):
+        calls.append(x)
+        return 2 * x
+    
+    double(1)
+    double(2)
+    double(3)
+    # 1 foi descartado para caber o 3; 3 continua em cache
+    double(3)
+    double(1)
+    assert calls == [1, 2, 3, 1]
+
+
+def test_is_shared_requires_reachable_redis(monkeypatch):
+    class Down:
+        def ping(self):
+            raise ConnectionError("Connection refused")
+    
+    class Up:
+        def ping(self):
+            return True
+    
+    monkeypatch.setattr(cache, "_redis", None)
+    assert not cache.is_shared()
+    monkeypatch.setattr(cache, "_redis", Down())
+    assert not cache.is_shared()
+    monkeypatch.setattr(cache, "_redis", Up())
+    assert cache.is_shared()
@@ -0,0 +1,186 @@
+"""
+Testes do cache latest_quotes: triggers de quotes e reconstrução só na migração
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, select, text, update
+
+from database import Base, SessionLocal, engine, has_trigger, init_db
+from models import Asset, LatestQuote, Quote, latest_quote_subquery
+
+DAY = datetime(2025, 12, 24)
+
+
+@pytest.fixture
+def db():
+    """Banco recriado do zero (tabelas e triggers) a cada teste"""
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    with SessionLocal() as session:
+        yield session
+
+
+def add_asset(db, ticker: str) -> Asset:
+    asset = Asset(ticker=ticker, display_ticker=ticker.removesuffix(".SA"), name=ticker, sector="Teste", asset_type="stock")
+    db.add(asset)
+    db.flush()
+    return asset
+
+
+def add_quote(db, asset: Asset, days: int, price_brl: float = 10.0) -> Quote:
+    quote = Quote(asset_id=asset.id, price_brl=price_brl, quote_date=DAY + timedelta(days=days))
+    db.add(quote)
+    db.flush()
+    return quote
+
+
+def cached_latest(db) -> dict:
+    """asset_id -> quote_id lido de latest_quotes"""
+    return dict(db.execute(select(LatestQuote.asset_id, LatestQuote.quote_id)).all())
+
+
+def expected_latest(db) -> dict:
+    """asset_id -> quote_id da cotação mais recente, calculado direto de quotes"""
+    latest = {}
+    for quote_id, asset_id, _ in db.execute(
+        select(Quote.id, Quote.asset_id, Quote.quote_date).order_by(Quote.quote_date)
+    ):
+        latest[asset_id] = quote_id
+    return latest
+
+
+def test_insert_and_delete_keep_latest(db):
+    petr, vale = add_asset(db, "PETR4.SA"), add_asset(db, "VALE3.SA")
+    add_quote(db, petr, 0)
+    newest = add_quote(db, petr, 2)
+    # Inserida fora de ordem: não substitui a mais recente
+    add_quote(db, petr, 1)
+    add_quote(db, vale, 0)
+    db.commit()
+    assert cached_latest(db)[petr.id] == newest.id
+    assert cached_latest(db) == expected_latest(db)
+    
+    db.delete(newest)
+    db.commit()
+    assert cached_latest(db) == expected_latest(db)
+
+
+def test_update_of_quote_date_keeps_latest(db):
+    asset = add_asset(db, "ITUB4.SA")
+    old = add_quote(db, asset, 0)
+    newest = add_quote(db, asset, 1)
+    db.commit()
+    
+    # A mais recente volta no tempo: a outra cotação passa a ser a última
+    db.execute(update(Quote).where(Quote.id == newest.id).values(quote_date=DAY - timedelta(days=1)))
+    db.commit()
+    assert cached_latest(db) == {asset.id: old.id}
+    
+    # E avança de novo
+    db.execute(update(Quote).where(Quote.id == newest.id).values(quote_date=DAY + timedelta(days=5)))
+    db.commit()
+    assert cached_latest(db) == {asset.id: newest.id}
+
+
+def test_update_of_asset_id_keeps_latest(db):
+    petr, vale = add_asset(db, "PETR4.SA"), add_asset(db, "VALE3.SA")
+    add_quote(db, petr, 0)
+    moved = add_quote(db, petr, 1)
+    add_quote(db, vale, 0)
+    db.commit()
+    
+    db.execute(update(Quote).where(Quote.id == moved.id).values(asset_id=vale.id))
+    db.commit()
+    assert cached_latest(db) == expected_latest(db)
+    assert cached_latest(db)[vale.id] == moved.id
+
+
+def test_save_quotes_upsert_keeps_latest(db):
+    fetcher = pytest.importorskip("fetcher")
+    
+    def result(ticker: str, days: int, price_brl: float) -> dict:
+        return {
+            "ticker": ticker,
+            "info": {"name": ticker, "sector": "Teste"},
+            "asset_type": "stock",
+            "quote_data": {"date": DAY + timedelta(days=days)},
+            "price_brl": price_brl,
+            "price_usd": None,
+        }
+    
+    fetcher.save_quotes(db, [result("PETR4.SA", 0, 10.0), result("VALE3.SA", 0, 20.0)])
+    fetcher.save_quotes(db, [result("PETR4.SA", 1, 11.0)])
+    before = cached_latest(db)
+    assert before == expected_latest(db)
+    
+    # Mesmo ativo e dia: ON CONFLICT DO UPDATE atualiza a linha existente (mesmo id)
+    fetcher.save_quotes(db, [result("PETR4.SA", 1, 12.0), result("VALE3.SA", 0, 21.0)])
+    assert cached_latest(db) == before
+    
+    prices = dict(db.execute(
+        select(Quote.id, Quote.price_brl).join(LatestQuote, LatestQuote.quote_id == Quote.id)
+    ).all())
+    assert sorted(prices.values()) == [12.0, 21.0]
+
+
+def test_latest_quote_subquery_reads_latest_quotes(db):
+    petr, vale = add_asset(db, "PETR4.SA"), add_asset(db, "VALE3.SA")
+    add_quote(db, petr, 0, price_brl=10.0)
+    add_quote(db, petr, 1, price_brl=11.0)
+    add_quote(db, vale, 0, price_brl=20.0)
+    db.commit()
+    
+    latest = latest_quote_subquery(db)
+    assert sorted(db.query(latest.price_brl).all()) == [(11.0,), (20.0,)]
+
+
+def test_refresh_runs_only_without_triggers(db):
+    asset = add_asset(db, "WEGE3.SA")
+    add_quote(db, asset, 0)
+    db.commit()
+    
+    # Com os triggers já criados, init_db não reconstrói o cache
+    db.execute(delete(LatestQuote))
+    db.commit()
+    init_db()
+    assert cached_latest(db) == {}
+    
+    # Banco antigo (sem os triggers): a migração reconstrói o cache uma vez
+    with engine.begin() as conn:
+        for name in ("latest_quotes_insert", "latest_quotes_delete", "latest_quotes_update"):
+            conn.execute(text(f"DROP TRIGGER {name}"))
+    assert not has_trigger("latest_quotes_insert")
+    init_db()
+    assert has_trigger("latest_quotes_insert")
+    assert cached_latest(db) == expected_latest(db)
+
+
+def test_init_db_concurrent_processes(tmp_path):
+    """Workers subindo juntos num banco novo: init_db serializado, nenhum processo falha"""
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    env = {**os.environ, "DB_PATH": str(tmp_path / "workers.db")}
+    code = "import sys; sys.path.insert(0, sys.argv[1]); from database import init_db; init_db()"
+    procs = [
+        subprocess.Popen([sys.executable, "-c", code, src], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        for _ in range(4)
+    ]
+    for proc in procs:
+        _, err = proc.communicate(timeout=120)
+        assert proc.returncode == 0, err.decode()
+
+
+def test_report_key_uses_fetched_at_index(db):
+    # Banco antigo sem o índice: a migração cria
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_quotes_fetched_at"))
+    init_db()
+    
+    # Conexão nova: as do pool podem guardar o schema de antes do índice
+    with sqlite3.connect(engine.url.database) as conn:
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT max(fetched_at) FROM quotes").fetchall()
+    assert "ix_quotes_fetched_at" in plan[0][-1]
@@ -0,0 +1,92 @@
+"""
+Testes dos sinais: signals_mask gravado pelo fetcher e filtro SQL (mask_expression) vs. detect
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from database import Base
+from models import Asset, Quote
+from signals import SIGNALS, SIGNAL_BITS, detect, from_mask, mask_expression, to_mask
+
+# Campos lidos por detect, na ordem dos argumentos, com valores de borda de cada regra
+# (None, zero, limiares e os dois lados deles)
+FIELD_VALUES = (
+    ("rsi_14", (None, 0.0, 15.0, 29.9, 30.0, 50.0, 70.0, 70.1, 85.0)),
+    ("ma_50_above_200", (None, 0, 1)),
+    ("above_ma_50", (None, 0, 1)),
+    ("above_ma_200", (None, 0, 1)),
+    ("pct_from_52w_high", (None, 0.0, -4.9, -5.0, -5.1, -30.0)),
+    ("week_52_low", (None, 0.0, 10.0, 100.0)),
+    ("price_brl", (0.0, 10.0, 10.4, 10.5, 10.6, 104.0, 200.0)),
+    ("volume_ratio", (None, 0.0, 1.5, 2.0, 2.01, 5.0)),
+    ("news_sentiment_combined", (None, 0.0, 0.3, 0.31, -0.3, -0.31, 0.9)),
+)
+FIELDS = tuple(name for name, _ in FIELD_VALUES)
+
+
+def make_cases(count: int = 500) -> list:
+    """Combinações determinísticas dos valores de borda"""
+    rng = random.Random(42)
+    return [{name: rng.choice(values) for name, values in FIELD_VALUES} for _ in range(count)]
+
+
+CASES = make_cases()
+
+
+def detected(case: dict) -> tuple:
+    """Regras em Python (avaliação por linha, como a API fazia antes do signals_mask)"""
+    return detect(*(case[name] for name in FIELDS))
+
+
+@pytest.fixture
+def db():
+    """Banco em memória com uma cotação por caso (mesmo ativo, um dia por caso)"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        asset = Asset(ticker="TEST3.SA", display_ticker="TEST3", name="Teste", sector="Teste", asset_type="stock")
+        session.add(asset)
+        session.flush()
+        session.add_all([
+            Quote(id=i + 1, asset_id=asset.id, quote_date=datetime(2025, 1, 1) + timedelta(days=i), **case)
+            for i, case in enumerate(CASES)
+        ])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def test_mask_round_trip():
+    for case in CASES:
+        signals = detected(case)
+        assert from_mask(to_mask(signals)) == list(signals)
+    assert to_mask(SIGNALS) == (1 << len(SIGNALS)) - 1
+
+
+def test_quote_values_mask_matches_detect():
+    fetcher = pytest.importorskip("fetcher")
+    for case in CASES:
+        quote_data = {name: value for name, value in case.items() if name != "price_brl"}
+        values = fetcher.quote_values(quote_data, case["price_brl"])
+        assert values["signals_mask"] == to_mask(detected(case)), case
+
+
+def test_mask_expression_matches_detect(db):
+    rows = db.execute(select(Quote.id, mask_expression(Quote)).order_by(Quote.id)).all()
+    assert len(rows) == len(CASES)
+    for (quote_id, mask), case in zip(rows, CASES):
+        assert from_mask(mask) == list(detected(case)), case
+
+
+@pytest.mark.parametrize("name", SIGNALS)
+def test_mask_expression_filters_same_rows(db, name):
+    expected = {i + 1 for i, case in enumerate(CASES) if name in detected(case)}
+    assert expected, f"no case triggers {name}"
+    found = set(db.scalars(
+        select(Quote.id).where(mask_expression(Quote).op("&")(SIGNAL_BITS[name]) != 0)
+    ))
+    assert found == expected